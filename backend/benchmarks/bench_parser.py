@@ -0,0 +1,86 @@
+"""Micro-benchmark for PrescriptionParser field extraction.
+
+Compares the combined rule scanner against the previous approach
+(one ``re.findall`` over the whole text per field plus one for medicines)
+on the OCR text samples in ``corpus/``. Catalog lookups are excluded so
+only text scanning is measured.
+
+    python backend/benchmarks/bench_parser.py --pages 5 --iterations 2000
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+
+from parser_prescription import PrescriptionParser  # noqa: E402
+
+CORPUS_DIR = BENCH_DIR / "corpus"
+
+LEGACY_PATTERNS = {
+    "patient_name": "Name:(.*)Date",
+    "doctor_name": "Dr (.*),",
+    "date": "Date:(.*)",
+    "patient_address": "Address:(.*)\n",
+}
+LEGACY_MEDICINE_PATTERN = r"(\b\w+\b)\s+(\d+mg|\d+\.\d+\sgram)\b"
+
+
+def legacy_scan(text):
+    fields = {}
+    for field, pattern in LEGACY_PATTERNS.items():
+        matches = re.findall(pattern, text, flags=re.IGNORECASE)
+        if matches:
+            fields[field] = matches[0].strip()
+    return fields, re.findall(LEGACY_MEDICINE_PATTERN, text, re.IGNORECASE)
+
+
+def engine_scan(text):
+    return PrescriptionParser(text).scan()
+
+
+def load_corpus(pages):
+    # Multi-page documents are simulated by repeating a sample's body
+    documents = []
+    for path in sorted(CORPUS_DIR.glob("*.txt")):
+        text = path.read_text()
+        documents.append("\n".join([text] * pages))
+    return documents
+
+
+def time_per_document(scan, documents, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text in documents:
+            scan(text)
+    return (time.perf_counter() - start) / (iterations * len(documents))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+
+    documents = load_corpus(args.pages)
+    if not documents:
+        sys.exit(f"No samples found in {CORPUS_DIR}")
+
+    for text in documents:
+        legacy_fields, _ = legacy_scan(text)
+        engine_fields, _ = engine_scan(text)
+        if legacy_fields != {k: v for k, v in engine_fields.items() if k in legacy_fields}:
+            print(f"Field mismatch: {legacy_fields} != {engine_fields}")
+
+    legacy = time_per_document(legacy_scan, documents, args.iterations)
+    engine = time_per_document(engine_scan, documents, args.iterations)
+    print(f"documents: {len(documents)} x {args.pages} page(s)")
+    print(f"legacy multi-pass: {legacy * 1e6:9.1f} us/doc")
+    print(f"rule scanner:      {engine * 1e6:9.1f} us/doc ({legacy / engine:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compare full-page OCR against adaptive ROI OCR.
+
+Each OCR text sample in ``corpus/`` is rendered onto a letter-size page
+image (or real scans are taken from ``--images``), recognized with both
+``OCR_MODE`` settings, and parsed. Reports latency per page and field
+accuracy against the parse of the ground-truth text. Needs Tesseract.
+
+    python backend/benchmarks/bench_preprocess.py --repeat 3
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+
+from PIL import Image, ImageDraw, ImageFont  # noqa: E402
+import extractor  # noqa: E402
+from parser_prescription import PrescriptionParser  # noqa: E402
+
+CORPUS_DIR = BENCH_DIR / "corpus"
+PAGE_SIZE_PX = (1700, 2200)  # US letter at 200 DPI
+
+
+def render_page(text):
+    page = Image.new("RGB", PAGE_SIZE_PX, "white")
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=34)
+    draw.multiline_text((150, 180), text, fill="black", font=font, spacing=18)
+    return page
+
+
+def field_accuracy(expected, actual):
+    expected_fields, expected_meds = expected
+    actual_fields, actual_meds = actual
+    checks = [actual_fields.get(field) == value for field, value in expected_fields.items()]
+    found = {name.lower() for name, _dose in actual_meds}
+    checks += [name.lower() in found for name, _dose in expected_meds]
+    return sum(checks) / len(checks) if checks else 1.0
+
+
+def load_samples(images_dir):
+    samples = []
+    for path in sorted(CORPUS_DIR.glob("*.txt")):
+        text = path.read_text()
+        image = Image.open(images_dir / f"{path.stem}.png") if images_dir else render_page(text)
+        samples.append((path.stem, image, PrescriptionParser(text).scan()))
+    return samples
+
+
+def run_mode(mode, samples, repeat):
+    extractor.OCR_MODE = mode
+    elapsed, accuracy = 0.0, 0.0
+    for _ in range(repeat):
+        for _name, image, expected in samples:
+            start = time.perf_counter()
+            text = extractor.ocr_image(image)
+            elapsed += time.perf_counter() - start
+            accuracy += field_accuracy(expected, PrescriptionParser(text).scan())
+    runs = repeat * len(samples)
+    return elapsed / runs, accuracy / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--images", type=Path, help="Directory of <sample>.png scans matching corpus/*.txt")
+    args = parser.parse_args()
+
+    samples = load_samples(args.images)
+    for mode in ("full", "roi"):
+        latency, accuracy = run_mode(mode, samples, args.repeat)
+        print(f"{mode:>4}: {latency * 1000:8.1f} ms/page  field accuracy {accuracy:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Accuracy and per-page time of prescription line extraction.
+
+Reads dosage, frequency, duration and quantity from the labeled samples in
+``corpus/`` (``<sample>.txt`` with ``<sample>.json`` labels) and from
+synthetic prescriptions, and checks every page against a fixed time
+budget. Labels may also list header ``fields`` (doctor_name, date, ...)
+that must survive medicines on the same line. Catalog lookups are excluded so only text extraction is measured.
+Exits non-zero when the p99 page time is over budget.
+
+    python backend/benchmarks/bench_rx_lines.py --count 200 --budget-ms 2
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+from common import BENCH_DIR, save_results, summarize
+import synthetic
+import dosage
+from parser_prescription import PrescriptionParser
+
+CORPUS_DIR = BENCH_DIR / "corpus"
+LABELED_FIELDS = ("dosage", "frequency", "duration", "quantity")
+
+
+def load_labeled_corpus():
+    pages = []
+    for path in sorted(CORPUS_DIR.glob("*.txt")):
+        labels = path.with_suffix(".json")
+        if labels.exists():
+            labels = json.loads(labels.read_text())
+            pages.append((path.read_text(), labels["medicines"], labels.get("fields", {})))
+    return pages
+
+
+def synthetic_pages(count, seed=7):
+    rng = random.Random(seed)
+    names = sorted(set(synthetic.load_mock_medicines())) or ["paracetamol"]
+    for _ in range(count):
+        page_texts, truth = synthetic.make_prescription(rng, names)
+        yield page_texts[0], truth["medicines"], {}
+
+
+def extract(text):
+    """Parser scan plus sig reading, i.e. build_medicines without the catalog."""
+    fields, matches = PrescriptionParser(text).scan()
+    lines = []
+    for match, sig in zip(matches, PrescriptionParser.read_sigs(matches)):
+        lines.append({
+            "dosage": match[1],
+            "frequency": sig["frequency"] or "N/A",
+            "duration": sig["duration"] or "N/A",
+            "quantity": dosage.quantity(sig),
+        })
+    return fields, lines
+
+
+def run(pages, repeat):
+    samples = []
+    correct = dict.fromkeys(LABELED_FIELDS, 0)
+    expected_lines = found_lines = 0
+    expected_fields = correct_fields = 0
+    for text, labels, field_labels in pages:
+        fields, lines = extract(text)
+        expected_fields += len(field_labels)
+        correct_fields += sum(fields.get(field) == value for field, value in field_labels.items())
+        expected_lines += len(labels)
+        found_lines += len(lines)
+        for line, label in zip(lines, labels):
+            for field in LABELED_FIELDS:
+                correct[field] += line[field] == label[field]
+        for _ in range(repeat):
+            start = time.perf_counter()
+            extract(text)
+            samples.append(time.perf_counter() - start)
+    return {
+        "pages": len(pages),
+        "lines_expected": expected_lines,
+        "lines_found": found_lines,
+        "accuracy": {field: correct[field] / expected_lines if expected_lines else None for field in LABELED_FIELDS},
+        "fields_expected": expected_fields,
+        "fields_correct": correct_fields,
+        "page_time": summarize(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=200, help="Synthetic pages in addition to corpus/")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed extractions per page")
+    parser.add_argument("--budget-ms", type=float, default=2.0, help="Allowed p99 extraction time per page")
+    parser.add_argument("--output", type=Path, help="Result file (default: results/rx_lines-<time>.json)")
+    args = parser.parse_args()
+
+    results = {
+        "corpus": run(load_labeled_corpus(), args.repeat),
+        "synthetic": run(list(synthetic_pages(args.count)), args.repeat),
+        "budget_ms": args.budget_ms,
+    }
+    over_budget = False
+    for name in ("corpus", "synthetic"):
+        result = results[name]
+        accuracy = ", ".join(f"{field} {value:.1%}" for field, value in result["accuracy"].items() if value is not None)
+        p99 = result["page_time"]["p99_ms"]
+        over_budget |= p99 is not None and p99 > args.budget_ms
+        print(f"{name}: {result['lines_found']}/{result['lines_expected']} lines, {accuracy}")
+        if result["fields_expected"]:
+            print(f"  header fields {result['fields_correct']}/{result['fields_expected']}")
+        print(f"  per page p50 {result['page_time']['p50_ms']:.3f} ms, p99 {p99:.3f} ms (budget {args.budget_ms} ms)")
+    print(f"Saved {save_results('rx_lines', results, args.output)}")
+    if over_budget:
+        sys.exit("Extraction is over the per-page time budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Per-stage timings of the extraction and order pipeline.
+
+Runs synthetic prescriptions through render, preprocess, OCR, parse,
+catalog lookup and order persistence, timing each stage separately.
+Stages whose external tools are missing (poppler, Tesseract) are reported
+as skipped; parsing then falls back to the ground-truth text.
+
+    python backend/benchmarks/bench_stages.py --count 20 --pages 2
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from common import save_results, summarize
+import synthetic
+
+
+def timed(samples, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    samples.append(time.perf_counter() - start)
+    return result
+
+
+def run(count, pages, orders):
+    import extractor
+    import utils
+    from pdf2image import convert_from_bytes
+    from medicine_catalog import get_catalog
+    from order_manager import OrderManager
+    from order_store import SQLiteOrderStore
+    from parser_prescription import PrescriptionParser
+
+    stages = ("catalog_load", "render", "preprocess", "ocr", "parse", "catalog", "persistence")
+    timings = {stage: [] for stage in stages}
+    skipped = {}
+    correct_fields = total_fields = 0
+    catalog = timed(timings["catalog_load"], get_catalog)
+    backend = extractor.get_ocr_backend()
+
+    for pdf_bytes, text, truth in synthetic.generate(count, pages):
+        page_texts = []
+        if "render" not in skipped:
+            try:
+                images = timed(timings["render"], lambda: convert_from_bytes(
+                    pdf_bytes, dpi=extractor.DEFAULT_DPI, poppler_path=extractor.POPPLER_PATH
+                ))
+                for image in images:
+                    processed = timed(timings["preprocess"], utils.preprocess_image, image)
+                    page_texts.append(timed(timings["ocr"], backend.image_to_string, processed))
+            except Exception as e:
+                skipped["render"] = skipped["preprocess"] = skipped["ocr"] = str(e)
+                page_texts = []
+        document_text = extractor.join_pages(page_texts) if page_texts else text
+
+        fields, matches = timed(timings["parse"], PrescriptionParser(document_text).scan)
+        if page_texts:
+            for field in ("patient_name", "doctor_name", "date", "patient_address"):
+                total_fields += 1
+                correct_fields += fields.get(field) == truth[field]
+        for name, *_ in matches:
+            timed(timings["catalog"], catalog.match, name)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = OrderManager(store=SQLiteOrderStore(Path(tmp) / "orders.sqlite3"))
+        for _pdf, _text, truth in synthetic.generate(orders, 1, seed=11):
+            timed(timings["persistence"], manager.generate_order, truth)
+        manager.close()
+
+    results = {stage: summarize(samples) for stage, samples in timings.items() if samples}
+    results["skipped"] = skipped
+    results["ocr_backend"] = backend.name
+    if total_fields:
+        results["ocr_field_accuracy"] = correct_fields / total_fields
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=10, help="Prescriptions to process")
+    parser.add_argument("--pages", type=int, default=1, help="Pages per prescription")
+    parser.add_argument("--orders", type=int, default=500, help="Orders to persist")
+    parser.add_argument("--output", type=Path, help="Result file (default: results/stages-<time>.json)")
+    args = parser.parse_args()
+
+    results = run(args.count, args.pages, args.orders)
+    for stage, summary in results.items():
+        if isinstance(summary, dict) and "p50_ms" in summary:
+            print(f"{stage:>14}: n={summary['count']:5d}  p50={summary['p50_ms']:9.3f} ms  p95={summary['p95_ms']:9.3f} ms")
+    for stage, reason in results["skipped"].items():
+        print(f"{stage:>14}: skipped ({reason})")
+    print(f"Saved {save_results('stages', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Shared helpers for the benchmark scripts: timing statistics and JSON results."""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCH_DIR.parent / "src"
+RESULTS_DIR = BENCH_DIR / "results"
+
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(samples_seconds, elapsed_seconds=None):
+    """Latency summary in milliseconds, plus throughput when wall time is known."""
+    summary = {
+        "count": len(samples_seconds),
+        "mean_ms": 1000 * sum(samples_seconds) / len(samples_seconds) if samples_seconds else None,
+        "p50_ms": _ms(percentile(samples_seconds, 0.50)),
+        "p95_ms": _ms(percentile(samples_seconds, 0.95)),
+        "p99_ms": _ms(percentile(samples_seconds, 0.99)),
+        "max_ms": _ms(max(samples_seconds) if samples_seconds else None),
+    }
+    if elapsed_seconds:
+        summary["throughput_per_s"] = len(samples_seconds) / elapsed_seconds
+    return summary
+
+
+def _ms(value):
+    return None if value is None else value * 1000
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": commit,
+    }
+
+
+def save_results(name, results, output=None):
+    """Write results to ``results/<name>-<timestamp>.json`` (or ``output``)."""
+    payload = {
+        "benchmark": name,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "results": results,
+    }
+    if output is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        output = RESULTS_DIR / f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w") as f:
+        json.dump(payload, f, indent=4)
+    return Path(output)
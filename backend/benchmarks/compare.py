@@ -0,0 +1,40 @@
+"""Compare two saved benchmark result files.
+
+    python backend/benchmarks/compare.py results/stages-old.json results/stages-new.json
+"""
+import argparse
+import json
+
+
+def flatten(results, prefix=""):
+    # Collect every latency summary, keyed by its path in the results
+    summaries = {}
+    for key, value in results.items():
+        if isinstance(value, dict) and "p50_ms" in value:
+            summaries[prefix + key] = value
+        elif isinstance(value, dict):
+            summaries.update(flatten(value, f"{prefix}{key}."))
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = flatten(json.load(f)["results"])
+    with open(args.candidate) as f:
+        candidate = flatten(json.load(f)["results"])
+
+    print(f"{'metric':>32} {'p50 base':>10} {'p50 new':>10} {'change':>8} {'p95 base':>10} {'p95 new':>10}")
+    for name in sorted(set(baseline) & set(candidate)):
+        old, new = baseline[name], candidate[name]
+        change = (new["p50_ms"] - old["p50_ms"]) / old["p50_ms"] if old["p50_ms"] else 0.0
+        print(f"{name:>32} {old['p50_ms']:10.3f} {new['p50_ms']:10.3f} {change:+8.1%} "
+              f"{old['p95_ms']:10.3f} {new['p95_ms']:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Local load driver for the FastAPI app.
+
+Fires concurrent requests either in-process (through httpx's ASGI
+transport, against a throwaway order database) or at a running server
+with ``--url``, and reports p50/p95/p99 latency and throughput per
+endpoint.
+
+    python backend/benchmarks/load_test.py --scenario orders --requests 2000 --concurrency 32
+    python backend/benchmarks/load_test.py --scenario extract --url http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from common import save_results, summarize
+import synthetic
+
+SCENARIOS = ("orders", "extract", "mixed")
+
+
+async def make_client(url):
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=120)
+    # Keep the in-process app away from the real order database
+    os.environ.setdefault("ORDER_DB_PATH", str(Path(tempfile.mkdtemp()) / "orders.sqlite3"))
+    from main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120)
+
+
+class Driver:
+    def __init__(self, client, documents):
+        self.client = client
+        self.documents = documents
+        self.order_ids = []
+        self.latencies = {}
+        self.errors = {}
+
+    async def call(self, name, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.latencies.setdefault(name, []).append(time.perf_counter() - start)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        return response if ok else None
+
+    async def order_request(self, rng):
+        roll = rng.random()
+        if roll < 0.4 or not self.order_ids:
+            _pdf, _text, truth = self.documents[rng.randrange(len(self.documents))]
+            response = await self.call("generate_order", "POST", "/generate_order", json=truth)
+            if response is not None:
+                self.order_ids.append(response.json()["order_id"])
+        elif roll < 0.8:
+            await self.call("track_order", "GET", f"/track_order/{rng.choice(self.order_ids)}")
+        else:
+            await self.call("order_history", "GET", "/order_history", params={"limit": 50})
+
+    async def extract_request(self, rng):
+        pdf_bytes, _text, _truth = self.documents[rng.randrange(len(self.documents))]
+        await self.call(
+            "extract_from_doc", "POST", "/extract_from_doc",
+            files={"file": ("rx.pdf", pdf_bytes, "application/pdf")},
+            data={"file_format": "prescription"}
+        )
+
+    async def run(self, scenario, total, concurrency, seed):
+        rng = random.Random(seed)
+        remaining = iter(range(total))
+
+        async def worker():
+            for _ in remaining:
+                if scenario == "orders" or (scenario == "mixed" and rng.random() < 0.8):
+                    await self.order_request(rng)
+                else:
+                    await self.extract_request(rng)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+
+async def run(args):
+    documents = list(synthetic.generate(args.documents, args.pages))
+    client = await make_client(args.url)
+    async with client:
+        driver = Driver(client, documents)
+        elapsed = await driver.run(args.scenario, args.requests, args.concurrency, args.seed)
+
+    all_samples = [sample for samples in driver.latencies.values() for sample in samples]
+    return {
+        "scenario": args.scenario,
+        "target": args.url or "in-process",
+        "concurrency": args.concurrency,
+        "elapsed_s": elapsed,
+        "overall": summarize(all_samples, elapsed),
+        "endpoints": {name: summarize(samples, elapsed) for name, samples in driver.latencies.items()},
+        "errors": driver.errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=SCENARIOS, default="orders")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--documents", type=int, default=20, help="Synthetic prescriptions to cycle through")
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process app)")
+    parser.add_argument("--output", type=Path, help="Result file (default: results/load-<time>.json)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    for name, summary in [("overall", results["overall"])] + sorted(results["endpoints"].items()):
+        print(f"{name:>18}: n={summary['count']:6d}  p50={summary['p50_ms']:8.2f}  p95={summary['p95_ms']:8.2f}  "
+              f"p99={summary['p99_ms']:8.2f} ms  {summary['throughput_per_s']:8.1f} req/s")
+    if results["errors"]:
+        print(f"errors: {results['errors']}")
+    print(f"Saved {save_results('load', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Synthetic prescriptions with known ground truth.
+
+Each prescription is produced as plain text in the layout PrescriptionParser
+expects and rendered to a PDF with FPDF, so OCR benchmarks have real pages
+to read and exact answers to compare against.
+
+    python backend/benchmarks/synthetic.py --count 20 --pages 2 --output /tmp/rx
+"""
+import argparse
+import json
+import random
+from pathlib import Path
+
+import common  # noqa: F401  (puts backend/src on sys.path)
+from fpdf import FPDF
+from medicine_catalog import load_mock_medicines
+
+FIRST_NAMES = ["Marta", "Virat", "Jerry", "Anna", "Kenji", "Priya", "Omar", "Lucia", "Tom", "Chen"]
+LAST_NAMES = ["Sharapova", "Kohli", "Lucas", "Petrova", "Watanabe", "Nair", "Haddad", "Rossi", "Baker", "Wei"]
+STREETS = ["Park Avenue", "Lake Road", "Oak Street", "Harbor View", "Wood Lane", "Hill Crescent"]
+DOSAGES = ["5mg", "10mg", "20mg", "40mg", "250mg", "500mg", "650mg", "1.2 gram", "2.4 gram"]
+# Sig text -> expected (frequency, duration, quantity)
+DIRECTIONS = {
+    "once daily": ("Once daily", "N/A", None),
+    "twice a day": ("Twice daily", "N/A", None),
+    "bid": ("Twice daily", "N/A", None),
+    "tid x 5 days": ("Three times daily", "5 days", 15),
+    "qhs": ("At bedtime", "N/A", None),
+    "as needed": ("As needed", "N/A", None),
+    "x 7 days": ("N/A", "7 days", None),
+}
+
+
+def make_prescription(rng, medicine_names, medicines_per_page=4, pages=1):
+    patient = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    doctor = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    date = f"{rng.randint(1, 28)}/{rng.randint(1, 12)}/{rng.randint(2020, 2026)}"
+    address = f"{rng.randint(1, 300)} {rng.choice(STREETS)}, Springfield"
+
+    page_texts, medicines = [], []
+    for page in range(pages):
+        lines = []
+        if page == 0:
+            lines += [f"Dr {doctor}, MD", "Community Clinic", "", f"Name: {patient} Date: {date}", "",
+                      f"Address: {address}", "", "Prescription:"]
+        for _ in range(medicines_per_page):
+            name = rng.choice(medicine_names).capitalize()
+            dosage = rng.choice(DOSAGES)
+            directions = rng.choice(list(DIRECTIONS))
+            frequency, duration, quantity = DIRECTIONS[directions]
+            lines.append(f"{name} {dosage} {directions}")
+            medicines.append({
+                "name": name, "dosage": dosage, "frequency": frequency, "duration": duration, "quantity": quantity,
+            })
+        page_texts.append("\n".join(lines))
+
+    truth = {
+        "patient_name": patient,
+        "doctor_name": doctor,
+        "date": date,
+        "patient_address": address,
+        "medicines": medicines,
+    }
+    return page_texts, truth
+
+
+def render_pdf(page_texts):
+    pdf = FPDF(format="letter")
+    pdf.set_auto_page_break(False)
+    for text in page_texts:
+        pdf.add_page()
+        pdf.set_font("Helvetica", "", 13)
+        pdf.set_xy(20, 20)
+        pdf.multi_cell(170, 8, text)
+    return bytes(pdf.output())
+
+
+def generate(count, pages=1, seed=7, medicines_per_page=4):
+    """Yield ``(pdf_bytes, text, truth)`` for ``count`` prescriptions."""
+    rng = random.Random(seed)
+    medicine_names = sorted(set(load_mock_medicines())) or ["paracetamol"]
+    for _ in range(count):
+        page_texts, truth = make_prescription(rng, medicine_names, medicines_per_page, pages)
+        yield render_pdf(page_texts), "\n".join(page_texts), truth
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic prescription PDFs with ground truth.")
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, required=True)
+    args = parser.parse_args()
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    for index, (pdf_bytes, _text, truth) in enumerate(generate(args.count, args.pages, args.seed)):
+        (args.output / f"rx_{index:04d}.pdf").write_bytes(pdf_bytes)
+        (args.output / f"rx_{index:04d}.json").write_text(json.dumps(truth, indent=4))
+    print(f"Wrote {args.count} prescriptions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import re
+import cv2
+import numpy as np
+from PIL import Image
+import utils
+
+# Render resolution is chosen so the page's long side lands near this size
+TARGET_LONG_SIDE_PX = 2200
+MIN_DPI = 150
+MAX_DPI = 300
+# Images larger than this are downscaled before any processing
+MAX_IMAGE_SIDE_PX = 2600
+
+# Regions smaller than this fraction of the page are treated as noise
+MIN_REGION_AREA = 0.002
+REGION_PADDING_PX = 12
+# If the detected regions cover most of the page, OCR the page as a whole
+MAX_ROI_COVERAGE = 0.85
+# Tesseract page segmentation mode for a single uniform block of text
+ROI_TESSERACT_CONFIG = "--psm 6"
+
+_PAGE_SIZE = re.compile(r"([\d.]+)\s*x\s*([\d.]+)\s*pts")
+
+
+def choose_dpi(page_size):
+    """Pick a render DPI from pdfinfo's "Page size" (e.g. "612 x 792 pts")."""
+    match = _PAGE_SIZE.search(page_size or "")
+    if not match:
+        return 200
+    long_side_inches = max(float(match.group(1)), float(match.group(2))) / 72
+    dpi = int(TARGET_LONG_SIDE_PX / long_side_inches)
+    return max(MIN_DPI, min(MAX_DPI, dpi))
+
+
+def downscale(image):
+    # Works on PIL images; OCR accuracy does not improve past ~300 DPI equivalents
+    longest = max(image.size)
+    if longest <= MAX_IMAGE_SIDE_PX:
+        return image
+    scale = MAX_IMAGE_SIDE_PX / longest
+    return image.resize((int(image.width * scale), int(image.height * scale)))
+
+
+def deskew(gray):
+    # Estimate the dominant text angle from the dark pixels and undo it
+    coords = np.column_stack(np.where(gray < 128))
+    if len(coords) < 100:
+        return gray
+    angle = cv2.minAreaRect(coords[:, ::-1].astype(np.float32))[-1]
+    if angle > 45:
+        angle -= 90
+    if abs(angle) < 0.5 or abs(angle) > 15:
+        return gray
+    height, width = gray.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(gray, matrix, (width, height), flags=cv2.INTER_LINEAR, borderValue=255)
+
+
+def detect_text_regions(gray):
+    """Return text block bounding boxes as (x, y, w, h), top to bottom."""
+    height, width = gray.shape
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    # A wide kernel joins characters into lines and lines into blocks
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(width // 60, 9), max(height // 200, 3)))
+    dilated = cv2.dilate(binary, kernel, iterations=2)
+    contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    min_area = MIN_REGION_AREA * width * height
+    regions = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w * h < min_area:
+            continue
+        x0, y0 = max(x - REGION_PADDING_PX, 0), max(y - REGION_PADDING_PX, 0)
+        x1, y1 = min(x + w + REGION_PADDING_PX, width), min(y + h + REGION_PADDING_PX, height)
+        regions.append((x0, y0, x1, y1))
+    return [(x0, y0, x1 - x0, y1 - y0) for x0, y0, x1, y1 in _merge_overlapping(regions)]
+
+
+def _merge_overlapping(boxes):
+    # Padded boxes of neighbouring lines overlap; OCR them as one block so no
+    # text is cut in half or read twice
+    boxes = sorted(boxes, key=lambda box: (box[1], box[0]))
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for box in boxes:
+            for index, other in enumerate(result):
+                if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                    result[index] = (min(box[0], other[0]), min(box[1], other[1]),
+                                     max(box[2], other[2]), max(box[3], other[3]))
+                    merged = True
+                    break
+            else:
+                result.append(box)
+        boxes = sorted(result, key=lambda box: (box[1], box[0]))
+    return boxes
+
+
+def _as_page_image(gray):
+    # utils.preprocess_image expects the same RGB PIL images poppler renders
+    return Image.fromarray(gray).convert("RGB")
+
+
+def ocr_regions(image, image_to_string):
+    """OCR only the text blocks of a page, falling back to the whole page.
+
+    ``image_to_string(image, config="")`` is the OCR backend call.
+    """
+    image = downscale(image)
+    gray = deskew(cv2.cvtColor(np.array(image.convert("RGB")), cv2.COLOR_RGB2GRAY))
+    regions = detect_text_regions(gray)
+
+    page_area = gray.shape[0] * gray.shape[1]
+    covered = sum(w * h for _, _, w, h in regions)
+    if not regions or covered > MAX_ROI_COVERAGE * page_area:
+        processed_image = utils.preprocess_image(_as_page_image(gray))
+        return image_to_string(processed_image)
+
+    texts = []
+    for x, y, w, h in regions:
+        processed_image = utils.preprocess_image(_as_page_image(gray[y:y + h, x:x + w]))
+        texts.append(image_to_string(processed_image, config=ROI_TESSERACT_CONFIG))
+    return "\n".join(texts)
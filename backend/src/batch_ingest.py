@@ -0,0 +1,169 @@
+"""Bulk prescription ingestion.
+
+Processes every PDF/image in a directory or ZIP archive through the
+extraction pipeline on a worker pool and emits one NDJSON line per document
+as soon as it completes. A checkpoint file records finished documents so an
+interrupted run can be resumed.
+
+    python batch_ingest.py scans.zip --checkpoint scans.ckpt --workers 4 > results.ndjson
+"""
+import argparse
+import hashlib
+import io
+import json
+import sys
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+SUPPORTED_SUFFIXES = {".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp"}
+
+
+class Checkpoint:
+    """Append-only record of processed documents."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.completed = set()
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path, "r") as f:
+                self.completed = {line.rstrip("\n") for line in f if line.strip()}
+
+    def __contains__(self, item_id):
+        return item_id in self.completed
+
+    def mark(self, item_id):
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(item_id + "\n")
+            self.completed.add(item_id)
+
+
+def iter_sources(source):
+    """Yield ``(item_id, size, read)``, where ``read()`` returns the file bytes.
+
+    For ZIP entries ``size`` is the uncompressed size from the archive;
+    zipfile never decompresses more than that.
+    """
+    source = Path(source)
+    if source.is_dir():
+        for path in sorted(source.rglob("*")):
+            if path.is_file() and path.suffix.lower() in SUPPORTED_SUFFIXES:
+                yield str(path.relative_to(source)), path.stat().st_size, path.read_bytes
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in sorted(archive.infolist(), key=lambda info: info.filename):
+                if not info.is_dir() and Path(info.filename).suffix.lower() in SUPPORTED_SUFFIXES:
+                    yield info.filename, info.file_size, lambda info=info: archive.read(info)
+    else:
+        raise ValueError(f"{source} is neither a directory nor a ZIP archive")
+
+
+def process_item(item_id, content, file_format, order_manager=None, extract=None):
+    # Imported here so the CLI can print --help without loading the OCR stack
+    from ingest import ingest_stream
+    if extract is None:
+        from extractor import extract_document as extract
+
+    result = {"source": item_id}
+    try:
+        with ingest_stream(io.BytesIO(content)) as document:
+            data = extract(document, file_format)
+        result["status"] = "ok"
+        result["data"] = data
+        if order_manager is not None and data.get("medicines"):
+            # Re-running an interrupted batch must not create the order twice
+            idempotency_key = f"batch:{item_id}:{hashlib.sha256(content).hexdigest()}"
+            result["order_id"] = order_manager.generate_order({
+                "patient_name": data.get("patient_name"),
+                "doctor_name": data.get("doctor_name"),
+                "medicines": data.get("medicines")
+            }, idempotency_key)
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    return result
+
+
+def run_batch(source, file_format="prescription", workers=4, checkpoint=None, order_manager=None, extract=None):
+    """Yield a result dict per document in completion order, then a summary.
+
+    At most ``2 * workers`` documents are read into memory at a time, and
+    none larger than ``MAX_UPLOAD_BYTES``; those are reported as errors
+    without being read. Documents already in ``checkpoint`` are skipped;
+    failed documents are not checkpointed so a resumed run retries them.
+    A document is checkpointed when the next result is requested, i.e.
+    after the consumer has handled its line.
+    ``extract(document, file_format)`` replaces the plain extraction, e.g.
+    to add caching.
+    """
+    from ingest import MAX_UPLOAD_BYTES
+    summary = {"processed": 0, "failed": 0, "skipped": 0, "orders_created": 0}
+    max_in_flight = max(workers, 1) * 2
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="batch-ingest") as pool:
+        in_flight = set()
+
+        def drain(return_when):
+            done, pending = wait(in_flight, return_when=return_when)
+            for future in done:
+                result = future.result()
+                if result["status"] == "ok":
+                    summary["processed"] += 1
+                    if "order_id" in result:
+                        summary["orders_created"] += 1
+                else:
+                    summary["failed"] += 1
+                yield result
+                # Resumed only once the consumer has written this result, so a
+                # crash or disconnect in between leaves it to the next run
+                if result["status"] == "ok" and checkpoint is not None:
+                    checkpoint.mark(result["source"])
+            in_flight.intersection_update(pending)
+
+        for item_id, size, read in iter_sources(source):
+            if checkpoint is not None and item_id in checkpoint:
+                summary["skipped"] += 1
+                continue
+            if size > MAX_UPLOAD_BYTES:
+                summary["failed"] += 1
+                yield {"source": item_id, "status": "error", "error": f"Document exceeds the {MAX_UPLOAD_BYTES} byte limit"}
+                continue
+            in_flight.add(pool.submit(process_item, item_id, read(), file_format, order_manager, extract))
+            if len(in_flight) >= max_in_flight:
+                yield from drain(FIRST_COMPLETED)
+        while in_flight:
+            yield from drain(FIRST_COMPLETED)
+
+    yield {"summary": summary}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract prescriptions in bulk and print NDJSON results.")
+    parser.add_argument("source", help="Directory or ZIP archive of PDFs/images")
+    parser.add_argument("--format", default="prescription", dest="file_format")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--checkpoint", help="File recording finished documents, used to resume")
+    parser.add_argument("--create-orders", action="store_true", help="Create an order for every extracted prescription")
+    parser.add_argument("--output", help="Write NDJSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    order_manager = None
+    if args.create_orders:
+        from order_manager import OrderManager
+        order_manager = OrderManager()
+    checkpoint = Checkpoint(args.checkpoint) if args.checkpoint else None
+
+    output = open(args.output, "a") if args.output else sys.stdout
+    try:
+        for result in run_batch(args.source, args.file_format, args.workers, checkpoint, order_manager):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Precompiled, memory-mapped medicine catalog files.
+
+The catalog is built from ``Medicine_Details.csv`` once and written as a
+flat binary file that every worker maps read-only, so the OS shares its
+pages between processes and startup does no CSV parsing at all.
+
+Layout (little-endian): a fixed header followed by seven sections, each
+4-byte aligned.
+
+* ``columns``    string table of record column names
+* ``fields``     string table of record values, row-major
+* ``names``      string table of normalized medicine names, one per row
+* ``name_order`` uint32 rows sorted by (normalized name, row)
+* ``keys``       string table of sorted token prefixes
+* ``key_starts`` uint32 offsets into ``postings``, one per key plus an end
+* ``postings``   uint32 rows containing each prefix, ascending
+
+A string table is a uint32 count, ``count + 1`` uint32 offsets and the
+UTF-8 blob. Exact names and prefixes are found by binary search.
+"""
+import mmap
+import os
+import struct
+import tempfile
+from collections.abc import Sequence
+from pathlib import Path
+
+MAGIC = b"RXCATLG\0"
+FORMAT_VERSION = 1
+SECTIONS = ("columns", "fields", "names", "name_order", "keys", "key_starts", "postings")
+# magic, version, row count, source size, source mtime, then (offset, length) per section
+HEADER = struct.Struct("<8sIIqq" + "II" * len(SECTIONS))
+
+
+class CatalogFormatError(ValueError):
+    pass
+
+
+def _align(buffer):
+    buffer.extend(b"\0" * (-len(buffer) % 4))
+
+
+def _string_table(strings):
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = [0]
+    for item in encoded:
+        offsets.append(offsets[-1] + len(item))
+    return struct.pack(f"<I{len(offsets)}I", len(encoded), *offsets) + b"".join(encoded)
+
+
+def _uint32_array(values):
+    return struct.pack(f"<{len(values)}I", *values)
+
+
+def write_catalog(path, columns, records, names, prefix_index, source_stat=None):
+    """Write the catalog tables to ``path`` atomically."""
+    keys = sorted(prefix_index)
+    key_starts, postings = [0], []
+    for key in keys:
+        postings.extend(prefix_index[key])
+        key_starts.append(len(postings))
+
+    sections = {
+        "columns": _string_table(columns),
+        "fields": _string_table(str(record[column]) for record in records for column in columns),
+        "names": _string_table(names),
+        "name_order": _uint32_array(sorted(range(len(names)), key=lambda row: (names[row], row))),
+        "keys": _string_table(keys),
+        "key_starts": _uint32_array(key_starts),
+        "postings": _uint32_array(postings),
+    }
+
+    body = bytearray(HEADER.size)
+    _align(body)
+    locations = []
+    for name in SECTIONS:
+        locations += [len(body), len(sections[name])]
+        body.extend(sections[name])
+        _align(body)
+    size, mtime = (source_stat.st_size, source_stat.st_mtime_ns) if source_stat else (-1, -1)
+    HEADER.pack_into(body, 0, MAGIC, FORMAT_VERSION, len(records), size, mtime, *locations)
+
+    # Write next to the target and rename, so readers never map a partial file
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class StringTable(Sequence):
+    def __init__(self, buffer, offset):
+        self.buffer = buffer
+        (self.count,) = struct.unpack_from("<I", buffer, offset)
+        offsets_end = offset + 4 + 4 * (self.count + 1)
+        self.offsets = memoryview(buffer)[offset + 4:offsets_end].cast("I")
+        self.blob = offsets_end
+
+    def __len__(self):
+        return self.count
+
+    def raw(self, index):
+        return self.buffer[self.blob + self.offsets[index]:self.blob + self.offsets[index + 1]]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return self.raw(index).decode("utf-8")
+
+
+class RecordView(Sequence):
+    """Rows of the catalog as dicts, decoded on access."""
+
+    def __init__(self, columns, fields):
+        self.columns = columns
+        self.fields = fields
+
+    def __len__(self):
+        return len(self.fields) // len(self.columns) if self.columns else 0
+
+    def __getitem__(self, row):
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        base = row * len(self.columns)
+        return {column: self.fields[base + i] for i, column in enumerate(self.columns)}
+
+
+class NameIndex:
+    """``by_name`` lookups over the sorted name order."""
+
+    def __init__(self, names, order):
+        self.names = names
+        self.order = order
+
+    def get(self, name, default=None):
+        target = name.encode("utf-8")
+        low, high = 0, len(self.order)
+        while low < high:
+            middle = (low + high) // 2
+            if self.names.raw(self.order[middle]) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.order) and self.names.raw(self.order[low]) == target:
+            return self.order[low]
+        return default
+
+
+class PrefixIndex:
+    """``prefix_index`` lookups returning posting lists as uint32 views."""
+
+    def __init__(self, keys, key_starts, postings):
+        self.keys = keys
+        self.key_starts = key_starts
+        self.postings = postings
+
+    def get(self, prefix, default=None):
+        target = prefix.encode("utf-8")
+        low, high = 0, len(self.keys)
+        while low < high:
+            middle = (low + high) // 2
+            if self.keys.raw(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.keys) and self.keys.raw(low) == target:
+            return self.postings[self.key_starts[low]:self.key_starts[low + 1]]
+        return default
+
+
+class MappedCatalog:
+    """Read-only catalog tables backed by a memory-mapped file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < HEADER.size:
+            raise CatalogFormatError(f"{self.path} is not a catalog file")
+        magic, version, self.row_count, size, mtime, *locations = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise CatalogFormatError(f"{self.path} has an unsupported catalog format")
+        self.source = (size, mtime)
+        sections = dict(zip(SECTIONS, zip(locations[::2], locations[1::2])))
+
+        def uint32s(name):
+            offset, length = sections[name]
+            return memoryview(self._mmap)[offset:offset + length].cast("I")
+
+        self.columns = list(StringTable(self._mmap, sections["columns"][0]))
+        self.names = StringTable(self._mmap, sections["names"][0])
+        self.records = RecordView(self.columns, StringTable(self._mmap, sections["fields"][0]))
+        self.by_name = NameIndex(self.names, uint32s("name_order"))
+        self.prefix_index = PrefixIndex(
+            StringTable(self._mmap, sections["keys"][0]), uint32s("key_starts"), uint32s("postings")
+        )
+
+    def built_from(self, source_stat):
+        return self.source == (source_stat.st_size, source_stat.st_mtime_ns)
@@ -0,0 +1,80 @@
+import json
+import os
+import re
+from pathlib import Path
+
+CONTROLLED_SUBSTANCES_PATH = Path(__file__).resolve().parent / "controlled_substances.json"
+# A medicine prescribed to the same patient again within this window is flagged
+DUPLICATE_WINDOW_DAYS = int(os.environ.get("DUPLICATE_WINDOW_DAYS", 30))
+
+_WHITESPACE = re.compile(r"\s+")
+# Strengths in compositions, e.g. "(37.5mg)"
+_STRENGTH = re.compile(r"\([^)]*\)")
+
+
+def normalize_key(value):
+    # Index key for patient, doctor and medicine names: case and spacing insensitive
+    if value is None:
+        return None
+    return _WHITESPACE.sub(" ", str(value)).strip().lower() or None
+
+
+def load_controlled_substances(path=CONTROLLED_SUBSTANCES_PATH):
+    """Map normalized medicine names to their schedule."""
+    try:
+        with open(path, "r") as f:
+            substances = json.load(f).get("controlled_substances", {})
+    except FileNotFoundError:
+        return {}
+    return {normalize_key(name): schedule for name, schedule in substances.items()}
+
+
+def active_ingredients(composition):
+    """Normalized ingredient names of a catalog composition.
+
+    ``"Tramadol (37.5mg) + Paracetamol (325mg)"`` -> ``["tramadol", "paracetamol"]``.
+    """
+    if not composition or composition == "N/A":
+        return []
+    keys = []
+    for part in str(composition).split("+"):
+        key = normalize_key(_STRENGTH.sub(" ", part))
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def order_items(order):
+    """Index rows for the medicines of one order.
+
+    Each prescription line gets a row keyed on the prescribed name and one
+    per active ingredient of its composition (``ingredient`` = 1), so brand
+    names are found by the generic names the controlled substance list
+    uses. Rows of a line are ordered by ``medicine_key``.
+    """
+    items = []
+    for line, medicine in enumerate(order.get("medicines") or []):
+        name = medicine.get("name") if isinstance(medicine, dict) else medicine
+        medicine_key = normalize_key(name)
+        if medicine_key is None:
+            continue
+        row = {
+            "order_id": order["order_id"],
+            "line": line,
+            "timestamp": order["timestamp"],
+            "patient_key": normalize_key(order.get("patient_name")),
+            "doctor_key": normalize_key(order.get("doctor_name")),
+            "medicine_key": medicine_key,
+            "ingredient": 0,
+            "patient_name": order.get("patient_name"),
+            "doctor_name": order.get("doctor_name"),
+            "medicine": name,
+            "dosage": medicine.get("dosage") if isinstance(medicine, dict) else None,
+        }
+        line_items = [row]
+        composition = medicine.get("composition") if isinstance(medicine, dict) else None
+        for ingredient_key in active_ingredients(composition):
+            if ingredient_key != medicine_key:
+                line_items.append(dict(row, medicine_key=ingredient_key, ingredient=1))
+        items.extend(sorted(line_items, key=lambda item: item["medicine_key"]))
+    return items
@@ -0,0 +1,137 @@
+"""Simulated pill dispenser.
+
+Listens for orders moving to "Verified", marks each one "Dispensing",
+waits while it "dispenses", then marks it "Ready" for collection. It can
+drive an in-process OrderManager (for tests) or a running server through
+the /order_events stream and /update_order_status API.
+
+    python dispenser_sim.py --url http://127.0.0.1:8000 --dispense-seconds 2
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+import telemetry
+from order_status import InvalidTransitionError
+
+
+class SimulatedDispenser:
+    """Dispenses verified orders one at a time on a background thread.
+
+    ``update_status(order_id, status)`` applies a status change; it is
+    ``OrderManager.update_status`` locally or an HTTP call remotely.
+    """
+
+    def __init__(self, update_status, dispense_seconds=0.5):
+        self.update_status = update_status
+        self.dispense_seconds = dispense_seconds
+        self.dispensed = []
+        self.failed = []
+        self._pending = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def handle(self, event):
+        # Event callback; must not block, so the work is queued
+        if event["status"] == "Verified":
+            self._pending.put(event["order_id"])
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="dispenser", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def wait_idle(self, timeout=None):
+        """Block until every queued order has been dispensed."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._pending.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                order_id = self._pending.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                self.dispense(order_id)
+            finally:
+                self._pending.task_done()
+
+    def dispense(self, order_id):
+        try:
+            self.update_status(order_id, "Dispensing")
+            time.sleep(self.dispense_seconds)
+            self.update_status(order_id, "Ready")
+            self.dispensed.append(order_id)
+        except InvalidTransitionError:
+            # Another dispenser took the order first
+            pass
+        except Exception:
+            # One bad order (lost connection, store error) must not stop the dispenser
+            self.failed.append(order_id)
+            telemetry.logger.exception("Dispensing order %s failed", order_id)
+
+
+def attach(order_manager, dispense_seconds=0.5):
+    """Start a dispenser wired to an in-process OrderManager."""
+    dispenser = SimulatedDispenser(order_manager.update_status, dispense_seconds).start()
+    unsubscribe = order_manager.events.subscribe(dispenser.handle)
+    return dispenser, unsubscribe
+
+
+def iter_events(session, base_url):
+    # Minimal SSE reader: yields the JSON payload of each "data:" line
+    last_event_id = None
+    while True:
+        headers = {"Last-Event-ID": last_event_id} if last_event_id else {}
+        try:
+            with session.get(f"{base_url}/order_events", params={"status": "Verified"},
+                             headers=headers, stream=True, timeout=(3.05, 60)) as response:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    if line.startswith("id:"):
+                        last_event_id = line[3:].strip()
+                    elif line.startswith("data:"):
+                        yield json.loads(line[5:])
+        except Exception as e:
+            print(f"Event stream interrupted ({e}), reconnecting")
+            time.sleep(1)
+
+
+def main(argv=None):
+    import requests
+
+    parser = argparse.ArgumentParser(description="Run a simulated pill dispenser against a running server.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--dispense-seconds", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    session = requests.Session()
+
+    def update_status(order_id, status):
+        response = session.post(f"{args.url}/update_order_status/{order_id}", json={"status": status}, timeout=10)
+        if response.status_code == 409:
+            raise InvalidTransitionError(response.json().get("detail"))
+        response.raise_for_status()
+        print(f"{order_id}: {status}")
+
+    dispenser = SimulatedDispenser(update_status, args.dispense_seconds).start()
+    try:
+        for event in iter_events(session, args.url):
+            dispenser.handle(event)
+    except KeyboardInterrupt:
+        dispenser.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Strength, frequency and duration of prescription lines.
+
+Strengths are normalized to a canonical unit (mass to mg, volume to ml,
+IU). Sig text such as "bid", "tid x 5 days" or "two tablets daily for three
+months" is read by one table-driven scanner; all lines of a prescription
+are scanned together in a single pass instead of once per line.
+"""
+import bisect
+import math
+import re
+
+# Unit spelling -> (canonical unit, factor to convert to it)
+STRENGTH_UNITS = {
+    "mg": ("mg", 1.0),
+    "g": ("mg", 1000.0),
+    "gm": ("mg", 1000.0),
+    "gram": ("mg", 1000.0),
+    "grams": ("mg", 1000.0),
+    "mcg": ("mg", 0.001),
+    "ug": ("mg", 0.001),
+    "ml": ("ml", 1.0),
+    "iu": ("IU", 1.0),
+    "unit": ("IU", 1.0),
+    "units": ("IU", 1.0),
+}
+# Longest spellings first so "grams" is not cut short at "g"
+UNIT_PATTERN = "|".join(sorted(STRENGTH_UNITS, key=len, reverse=True))
+STRENGTH_PATTERN = rf"\d+(?:\.\d+)?[ ]?(?:{UNIT_PATTERN})"
+_STRENGTH = re.compile(rf"(\d+(?:\.\d+)?)[ ]?({UNIT_PATTERN})\b", re.IGNORECASE)
+
+# Sig phrase -> (label shown to the pharmacist, doses per day; None when as needed)
+FREQUENCIES = {
+    "qd": ("Once daily", 1),
+    "od": ("Once daily", 1),
+    "once": ("Once daily", 1),
+    "once daily": ("Once daily", 1),
+    "once a day": ("Once daily", 1),
+    "daily": ("Once daily", 1),
+    "every day": ("Once daily", 1),
+    "qam": ("Every morning", 1),
+    "every morning": ("Every morning", 1),
+    "before breakfast": ("Before breakfast", 1),
+    "qpm": ("Every evening", 1),
+    "qhs": ("At bedtime", 1),
+    "hs": ("At bedtime", 1),
+    "at bedtime": ("At bedtime", 1),
+    "at night": ("At bedtime", 1),
+    "nightly": ("At bedtime", 1),
+    "bid": ("Twice daily", 2),
+    "bd": ("Twice daily", 2),
+    "twice": ("Twice daily", 2),
+    "twice daily": ("Twice daily", 2),
+    "twice a day": ("Twice daily", 2),
+    "tid": ("Three times daily", 3),
+    "tds": ("Three times daily", 3),
+    "thrice daily": ("Three times daily", 3),
+    "qid": ("Four times daily", 4),
+    "qds": ("Four times daily", 4),
+    "prn": ("As needed", None),
+    "as needed": ("As needed", None),
+    "when required": ("As needed", None),
+}
+NUMBER_WORDS = {
+    "a": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+DURATION_DAYS = {"day": 1, "week": 7, "month": 30}
+# Words that open directions ("Apply 5 ml twice daily"); never a medicine name
+SIG_VERBS = (
+    "take", "apply", "use", "give", "inhale", "instill", "instil", "inject",
+    "insert", "chew", "dissolve", "spray", "place", "rub", "mix",
+)
+
+_NUMBER = r"\d+|" + "|".join(NUMBER_WORDS)
+_PHRASES = "|".join(
+    phrase.replace(" ", r"\s+") for phrase in sorted(FREQUENCIES, key=len, reverse=True)
+)
+_SIG = re.compile(
+    "|".join([
+        rf"(?P<duration>\b(?:x|for)\s*({_NUMBER})\s*(day|week|month)s?\b)",
+        rf"(?P<times>\b({_NUMBER})\s*(?:times|x)\s*(?:a|per|/)?\s*(?:day|daily)\b)",
+        r"(?P<every>\b(?:q|every\s*)(\d+)\s*(?:h|hrs?|hours?)\b)",
+        rf"(?P<count>\b({_NUMBER})\s*(?:tablets?|tabs?|capsules?|caps?|pills?|puffs?|drops?)\b)",
+        rf"(?P<phrase>\b(?:{_PHRASES})\b)",
+    ]),
+    re.IGNORECASE,
+)
+_GROUPS = {name: _SIG.groupindex[name] for name in ("duration", "times", "every", "count", "phrase")}
+# Which sig value each kind of match fills
+_FILLS = {"duration": "duration", "times": "frequency", "every": "frequency", "count": "count", "phrase": "frequency"}
+
+
+def _number(text):
+    text = text.lower()
+    return int(text) if text.isdigit() else NUMBER_WORDS[text]
+
+
+def parse_strength(dosage):
+    """``"2.4 gram"`` -> ``(2400.0, "mg")``; ``(None, None)`` if unreadable."""
+    match = _STRENGTH.search(dosage or "")
+    if match is None:
+        return None, None
+    unit, factor = STRENGTH_UNITS[match.group(2).lower()]
+    return round(float(match.group(1)) * factor, 6), unit
+
+
+def empty_sig():
+    return {"frequency": None, "doses_per_day": None, "duration": None, "duration_days": None, "units_per_dose": 1}
+
+
+def parse_sigs(texts):
+    """Read frequency, duration and units per dose from each text.
+
+    All texts are joined and scanned at once; each match is mapped back to
+    its line by offset. The first value of each kind on a line wins.
+    """
+    sigs = [empty_sig() for _ in texts]
+    if not texts:
+        return sigs
+    starts = []
+    offset = 0
+    for text in texts:
+        starts.append(offset)
+        offset += len(text) + 1
+    joined = "\n".join(text.replace("\n", " ") for text in texts)
+
+    seen = [set() for _ in texts]
+    for match in _SIG.finditer(joined):
+        line = bisect.bisect_right(starts, match.start()) - 1
+        kind = match.lastgroup
+        if _FILLS[kind] in seen[line]:
+            continue
+        seen[line].add(_FILLS[kind])
+
+        sig = sigs[line]
+        index = _GROUPS[kind]
+        if kind == "duration":
+            count, unit = _number(match.group(index + 1)), match.group(index + 2).lower()
+            sig["duration"] = f"{count} {unit}" + ("s" if count != 1 else "")
+            sig["duration_days"] = count * DURATION_DAYS[unit]
+        elif kind == "times":
+            count = _number(match.group(index + 1))
+            sig["frequency"], sig["doses_per_day"] = f"{count} times daily", count
+        elif kind == "every":
+            hours = int(match.group(index + 1))
+            if hours:
+                sig["frequency"], sig["doses_per_day"] = f"Every {hours} hours", 24 / hours
+        elif kind == "count":
+            sig["units_per_dose"] = _number(match.group(index + 1))
+        else:
+            phrase = " ".join(match.group(index).lower().split())
+            sig["frequency"], sig["doses_per_day"] = FREQUENCIES[phrase]
+    return sigs
+
+
+def has_sig(sig):
+    return sig["frequency"] is not None or sig["duration_days"] is not None
+
+
+def quantity(sig):
+    """Units to dispense for the whole course, or None if it is open ended."""
+    if not sig["doses_per_day"] or not sig["duration_days"]:
+        return None
+    return math.ceil(sig["units_per_dose"] * sig["doses_per_day"] * sig["duration_days"])
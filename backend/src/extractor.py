@@ -1,25 +1,352 @@
-from pdf2image import convert_from_path
-import pytesseract
-import utils
-from parser_prescription import PrescriptionParser
+import multiprocessing
+import os
+import queue
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image
+import telemetry
+from ingest import ingest_path
+from parser_prescription import PARSER_VERSION, PrescriptionParser
 
 POPPLER_PATH = r"C:/poppler-24.08.0/Library/bin"
 TESSERACT_ENGINE_PATH = r"C:/Program Files/Tesseract-OCR/tesseract.exe"
-pytesseract.pytesseract.tesseract_cmd = TESSERACT_ENGINE_PATH
+OCR_LANG = "eng"
+# "auto" uses long-lived tesserocr engines when installed, else pytesseract
+OCR_ENGINE = os.environ.get("OCR_ENGINE", "auto")
+TESSDATA_PATH = os.environ.get(
+    "TESSDATA_PREFIX", os.path.join(os.path.dirname(TESSERACT_ENGINE_PATH), "tessdata")
+)
+# Loaded tesserocr engines kept per process (one per concurrently OCRing thread)
+OCR_ENGINE_POOL_SIZE = int(os.environ.get("OCR_ENGINE_POOL_SIZE", 2))
+# "full" OCRs whole pages at poppler's default DPI; "roi" picks the render DPI
+# from the page size and OCRs only detected text regions
+OCR_MODE = os.environ.get("OCR_MODE", "full")
+DEFAULT_DPI = 200
+
+# Bump when rendering, preprocessing or OCR changes so cached extraction
+# results are not reused; parsing changes bump PARSER_VERSION instead
+OCR_CONFIG_VERSION = f"1:{OCR_LANG}:{OCR_MODE}:{OCR_ENGINE}:parser{PARSER_VERSION}"
+
+# OCR pool settings (override with environment variables)
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", os.cpu_count() or 1))
+OCR_MAX_PENDING_PAGES = int(os.environ.get("OCR_MAX_PENDING_PAGES", OCR_WORKERS * 2))
+
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+# Bounds the number of pages queued on the pool across all requests
+_pending_pages = threading.BoundedSemaphore(max(OCR_MAX_PENDING_PAGES, 1))
+
+
+class PytesseractBackend:
+    """Runs the tesseract executable once per image."""
+
+    name = "pytesseract"
+
+    def __init__(self):
+        # pytesseract pulls in pandas and numpy, so it is imported here
+        # rather than when the module loads
+        import pytesseract
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_ENGINE_PATH
+        self._pytesseract = pytesseract
+
+    def warm_up(self):
+        pass
+
+    def image_to_string(self, image, config=""):
+        return self._pytesseract.image_to_string(image, lang=OCR_LANG, config=config)
+
+    def close(self):
+        pass
+
+
+class TesserocrBackend:
+    """Pool of tesserocr API handles that keep the language model loaded.
+
+    A handle is not thread-safe, so each call borrows one from the pool;
+    up to ``size`` handles are created on demand and then reused.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, size=OCR_ENGINE_POOL_SIZE):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self.size = max(size, 1)
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _new_api(self):
+        if os.path.isdir(TESSDATA_PATH):
+            return self._tesserocr.PyTessBaseAPI(path=TESSDATA_PATH, lang=OCR_LANG)
+        return self._tesserocr.PyTessBaseAPI(lang=OCR_LANG)
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if create:
+            try:
+                return self._new_api()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get()
+
+    def preload(self, count):
+        # Load engines up front so no request pays the model load
+        apis = [self._acquire() for _ in range(min(count, self.size))]
+        for api in apis:
+            self._idle.put(api)
+
+    def warm_up(self):
+        self.preload(self.size)
+
+    def image_to_string(self, image, config=""):
+        if not isinstance(image, Image.Image):
+            image = Image.fromarray(image)
+        psm = re.search(r"--psm\s+(\d+)", config)
+        api = self._acquire()
+        try:
+            api.SetPageSegMode(int(psm.group(1)) if psm else self._tesserocr.PSM.AUTO)
+            api.SetImage(image)
+            return api.GetUTF8Text()
+        finally:
+            self._idle.put(api)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().End()
+            except queue.Empty:
+                break
+
+
+_ocr_backend = None
+_ocr_backend_lock = threading.Lock()
+
+
+def get_ocr_backend():
+    # One backend per process, created on first use (or by warm_up)
+    global _ocr_backend
+    if _ocr_backend is None:
+        with _ocr_backend_lock:
+            if _ocr_backend is None:
+                _ocr_backend = _create_ocr_backend()
+    return _ocr_backend
+
+
+def _create_ocr_backend():
+    if OCR_ENGINE == "tesserocr":
+        return TesserocrBackend()
+    if OCR_ENGINE == "auto":
+        try:
+            backend = TesserocrBackend()
+            # One engine is loaded here so a broken install (e.g. no
+            # tessdata at TESSDATA_PATH) falls back instead of failing later
+            backend.preload(1)
+            return backend
+        except ImportError:
+            telemetry.logger.warning("tesserocr is not installed, falling back to pytesseract.")
+        except Exception:
+            telemetry.logger.warning("tesserocr failed to load, falling back to pytesseract.", exc_info=True)
+    return PytesseractBackend()
+
+
+def _init_ocr_worker():
+    # Worker processes are not forked from the server, so they load their own engine
+    get_ocr_backend().warm_up()
+
+
+def _worker_ready():
+    return os.getpid()
+
+
+def warm_up():
+    """Load OCR engines in this process and start the OCR worker processes."""
+    get_ocr_backend().warm_up()
+    if OCR_WORKERS > 1:
+        pool = get_ocr_pool()
+        # Each worker loads its engine in the initializer before answering
+        for future in [pool.submit(_worker_ready) for _ in range(OCR_WORKERS)]:
+            future.result()
+
+
+def _pool_context():
+    # The server already runs threads (request threadpool, order writer), so
+    # forking it could copy a held lock into a worker; forkserver and spawn
+    # start workers from a clean process
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def get_ocr_pool():
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            _ocr_pool = ProcessPoolExecutor(
+                max_workers=OCR_WORKERS, mp_context=_pool_context(), initializer=_init_ocr_worker
+            )
+        return _ocr_pool
 
-def extract(file_path, file_format):
-    # Extract text from PDF
-    pages = convert_from_path(file_path, poppler_path=POPPLER_PATH)
-    document_text = ""
-    for page in pages:
-        processed_image = utils.preprocess_image(page)
-        text = pytesseract.image_to_string(processed_image, lang="eng")
-        document_text = document_text + "\n" + text
 
+def _discard_ocr_pool(pool):
+    # A worker died (crash, OOM kill) and the pool refuses all work; the next
+    # get_ocr_pool() starts a new one
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is pool:
+            _ocr_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_ocr_pool():
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is not None:
+            _ocr_pool.shutdown(wait=True, cancel_futures=True)
+            _ocr_pool = None
+    if _ocr_backend is not None:
+        _ocr_backend.close()
+
+
+def image_to_string(image, config=""):
+    with telemetry.stage_timer("image_to_string"):
+        return get_ocr_backend().image_to_string(image, config)
+
+
+def ocr_image(image):
+    # OpenCV is imported on the first page, not at startup
+    import utils
+    import adaptive_preprocess
+    if OCR_MODE == "roi":
+        with telemetry.stage_timer("ocr_regions"):
+            return adaptive_preprocess.ocr_regions(image, image_to_string)
+    with telemetry.stage_timer("preprocess_image"):
+        processed_image = utils.preprocess_image(image)
+    return image_to_string(processed_image)
+
+
+def render_pdf(file_path, dpi, **kwargs):
+    from pdf2image import convert_from_path
+    with telemetry.stage_timer("render_pdf"):
+        return convert_from_path(file_path, dpi=dpi, poppler_path=POPPLER_PATH, **kwargs)
+
+
+def _ocr_pdf_page(file_path, page_number, dpi=DEFAULT_DPI):
+    # Render and recognize a single page inside a pool worker
+    pages = render_pdf(file_path, dpi, first_page=page_number, last_page=page_number)
+    return "\n".join(ocr_image(page) for page in pages)
+
+
+def _run_in_worker(func, *args):
+    # Stage timings recorded in a worker process are returned with the result
+    # so they end up in the parent's metrics
+    with telemetry.capture() as observations:
+        result = func(*args)
+    return result, observations
+
+
+def _release_page_slot(_future):
+    _pending_pages.release()
+
+
+def _map_on_pool(func, arg_tuples):
+    # A pool with a dead worker is replaced and the pages are retried once
+    arg_tuples = list(arg_tuples)
+    for attempt in range(2):
+        pool = get_ocr_pool()
+        try:
+            return _map_on(pool, func, arg_tuples)
+        except BrokenProcessPool:
+            _discard_ocr_pool(pool)
+            if attempt:
+                raise
+            telemetry.logger.warning("An OCR worker died, restarting the OCR pool.")
+
+
+def _map_on(pool, func, arg_tuples):
+    # Submit with a bound on queued work; results come back in submission order
+    futures = []
+    for args in arg_tuples:
+        _pending_pages.acquire()
+        try:
+            future = pool.submit(_run_in_worker, func, *args)
+        except Exception:
+            _pending_pages.release()
+            raise
+        future.add_done_callback(_release_page_slot)
+        futures.append(future)
+    results = []
+    for future in futures:
+        result, observations = future.result()
+        telemetry.replay(observations)
+        results.append(result)
+    return results
+
+
+def join_pages(page_texts):
+    # Every page is preceded by a newline, as before
+    return "\n".join([""] + page_texts)
+
+
+def ocr_pdf(file_path):
+    from pdf2image import pdfinfo_from_path
+    import adaptive_preprocess
+    file_path = str(file_path)
+    info = pdfinfo_from_path(file_path, poppler_path=POPPLER_PATH)
+    page_count = info["Pages"]
+    dpi = adaptive_preprocess.choose_dpi(info.get("Page size")) if OCR_MODE == "roi" else DEFAULT_DPI
+
+    # Single pages or a single worker are not worth the IPC round trip
+    if page_count <= 1 or OCR_WORKERS <= 1:
+        pages = render_pdf(file_path, dpi)
+        page_texts = [ocr_image(page) for page in pages]
+    else:
+        page_texts = _map_on_pool(_ocr_pdf_page, [(file_path, n, dpi) for n in range(1, page_count + 1)])
+
+    return join_pages(page_texts)
+
+
+def ocr_images(images):
+    if len(images) <= 1 or OCR_WORKERS <= 1:
+        page_texts = [ocr_image(image) for image in images]
+    else:
+        page_texts = _map_on_pool(ocr_image, [(image,) for image in images])
+    return join_pages(page_texts)
+
+
+def ocr_document(document):
+    if document.is_pdf:
+        with document.pdf_path() as file_path:
+            return ocr_pdf(file_path)
+    # Images are decoded in memory and never touch the disk
+    return ocr_images(document.images())
+
+
+def parse_text(document_text, file_format):
     # Extract fields from text
     if file_format == "prescription":
         extracted_data = PrescriptionParser(document_text).parse()
     else:
         raise Exception(f"Invalid file format: {file_format}")
 
-    return extracted_data
\ No newline at end of file
+    return extracted_data
+
+
+def extract_document(document, file_format):
+    with telemetry.stage_timer("extract"):
+        return parse_text(ocr_document(document), file_format)
+
+
+def extract(file_path, file_format):
+    with ingest_path(file_path) as document:
+        return extract_document(document, file_format)
@@ -0,0 +1,90 @@
+import heapq
+import re
+
+_WORD = re.compile(r"[a-z][a-z0-9]*")
+
+
+def trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, max_distance=None):
+    # Levenshtein distance with an optional early cut-off
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class TrigramMatcher:
+    """Character-trigram inverted index for OCR-tolerant name lookup.
+
+    Candidates sharing the most trigrams with the query are re-ranked by
+    edit distance, so only a handful of distance computations run per query.
+    """
+
+    def __init__(self, terms, max_candidates=25):
+        self.terms = []
+        self.term_ids = {}
+        self.index = {}
+        self.max_candidates = max_candidates
+        for term in terms:
+            term = term.lower().strip()
+            if not term or term in self.term_ids:
+                continue
+            term_id = len(self.terms)
+            self.terms.append(term)
+            self.term_ids[term] = term_id
+            for gram in trigrams(term):
+                self.index.setdefault(gram, []).append(term_id)
+
+    def __contains__(self, term):
+        return term.lower().strip() in self.term_ids
+
+    def search(self, query, k=5, max_distance=3):
+        query = query.lower().strip()
+        if not query:
+            return []
+        query_grams = trigrams(query)
+        shared = {}
+        for gram in query_grams:
+            for term_id in self.index.get(gram, ()):
+                shared[term_id] = shared.get(term_id, 0) + 1
+        if not shared:
+            return []
+
+        ranked = heapq.nlargest(self.max_candidates, shared.items(), key=lambda item: item[1])
+        results = []
+        for term_id, _ in ranked:
+            term = self.terms[term_id]
+            distance = edit_distance(query, term, max_distance)
+            if distance > max_distance:
+                continue
+            score = 1 - distance / max(len(query), len(term))
+            results.append({"name": term, "distance": distance, "score": round(score, 3)})
+        results.sort(key=lambda result: (result["distance"], -result["score"], result["name"]))
+        return results[:k]
+
+
+def catalog_terms(names):
+    # The brand word (first word) of each catalog entry is what prescriptions name
+    for name in names:
+        match = _WORD.search(name.lower())
+        if match:
+            yield match.group(0)
@@ -0,0 +1,147 @@
+import hashlib
+import io
+import os
+import tempfile
+from contextlib import contextmanager
+from PIL import Image
+
+# Upload limits (override with environment variables)
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 25 * 1024 * 1024))
+SPOOL_MAX_MEMORY = int(os.environ.get("SPOOL_MAX_MEMORY", 4 * 1024 * 1024))
+CHUNK_SIZE = 1024 * 1024
+
+# Magic bytes of the formats the frontend accepts
+MAGIC_NUMBERS = [
+    (b"%PDF-", "pdf"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"II*\x00", "tiff"),
+    (b"MM\x00*", "tiff"),
+    (b"BM", "bmp"),
+]
+
+
+class UploadTooLargeError(Exception):
+    pass
+
+
+class UnsupportedFormatError(Exception):
+    pass
+
+
+def detect_format(head):
+    for magic, kind in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+class IngestedDocument:
+    """An uploaded document held in a spooled buffer.
+
+    Small uploads stay in memory; larger ones roll over to an anonymous
+    temporary file that disappears on ``close``.
+    """
+
+    def __init__(self, kind, spool, size, sha256):
+        self.kind = kind
+        self.spool = spool
+        self.size = size
+        self.sha256 = sha256
+
+    @property
+    def is_pdf(self):
+        return self.kind == "pdf"
+
+    def read_bytes(self):
+        self.spool.seek(0)
+        return self.spool.read()
+
+    def images(self):
+        # Images are decoded straight from the buffer, one entry per frame
+        self.spool.seek(0)
+        image = Image.open(io.BytesIO(self.spool.read()))
+        frames = []
+        for index in range(getattr(image, "n_frames", 1)):
+            image.seek(index)
+            frames.append(image.convert("RGB"))
+        return frames
+
+    @contextmanager
+    def pdf_path(self):
+        # Poppler needs a named file, so PDFs are copied to disk once more;
+        # the copy is always removed
+        self.spool.seek(0)
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            while True:
+                chunk = self.spool.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+            path = f.name
+        try:
+            yield path
+        finally:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        self.spool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _read_chunks(stream, max_bytes, sink=None):
+    # Hash the stream chunk by chunk, enforcing the size cap; returns (size, head, sha256)
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds the {max_bytes} byte limit")
+        if len(head) < 16:
+            head += chunk[:16]
+        digest.update(chunk)
+        if sink is not None:
+            sink.write(chunk)
+    kind = detect_format(head)
+    if kind is None:
+        raise UnsupportedFormatError("Unsupported file type, expected a PDF or an image")
+    return kind, size, digest.hexdigest()
+
+
+def ingest_stream(stream, max_bytes=MAX_UPLOAD_BYTES):
+    """Read an upload in chunks, hashing it and enforcing the size cap."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    try:
+        kind, size, sha256 = _read_chunks(stream, max_bytes, sink=spool)
+    except Exception:
+        spool.close()
+        raise
+    return IngestedDocument(kind, spool, size, sha256)
+
+
+def ingest_file(file, max_bytes=MAX_UPLOAD_BYTES):
+    """Wrap an already buffered, seekable upload without copying it.
+
+    The returned document owns ``file`` and closes it; on error the caller
+    keeps ownership.
+    """
+    file.seek(0)
+    kind, size, sha256 = _read_chunks(file, max_bytes)
+    return IngestedDocument(kind, file, size, sha256)
+
+
+def ingest_path(file_path, max_bytes=MAX_UPLOAD_BYTES):
+    with open(file_path, "rb") as f:
+        return ingest_stream(f, max_bytes)
@@ -0,0 +1,188 @@
+import io
+import zipfile
+
+UNIT_PRICE = 12.99  # Example price per unit
+
+# Static layout: every element has a fixed position, so it is resolved once
+# into draw operations instead of being recomputed per invoice.
+PAGE_WIDTH = 210
+MARGIN = 15
+CONTENT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+LINE_HEIGHT = 6
+TABLE_TOP = 70
+PAGE_BOTTOM = 270
+
+HEADER_FIELDS = [
+    ("Order ID", "order_id"),
+    ("Patient Name", "patient_name"),
+    ("Doctor Name", "doctor_name"),
+    ("Date", "timestamp"),
+]
+TABLE_COLUMNS = [
+    ("Medicine", 50, "L"),
+    ("Dosage", 25, "L"),
+    ("Frequency", 30, "L"),
+    ("Duration", 25, "L"),
+    ("Price", 20, "R"),
+    ("Qty", 10, "R"),
+    ("Amount", 20, "R"),
+]
+
+
+def _latin1(value):
+    # The built-in PDF fonts only cover Latin-1
+    return str(value).encode("latin-1", "replace").decode("latin-1")
+
+
+def parse_quantity(value):
+    """A positive whole quantity from a number or numeric string, or None if unset."""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"Invalid quantity {value!r}")
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"Invalid quantity {value!r}")
+    if not number.is_integer() or number < 1:
+        raise ValueError(f"Invalid quantity {value!r}")
+    return int(number)
+
+
+def invoice_lines(order):
+    lines = []
+    total_price = 0
+    for med in order.get("medicines") or []:
+        # Orders stored before medicines were validated may hold bare names
+        # or other values; names are billed, anything else is left out
+        if isinstance(med, str):
+            med = {"name": med}
+        elif not isinstance(med, dict):
+            continue
+        price = UNIT_PRICE
+        # Parsed from the sig (or set by the pharmacist); open-ended courses
+        # and orders stored before quantities were validated bill one unit
+        try:
+            quantity = parse_quantity(med.get("quantity")) or 1
+        except ValueError:
+            quantity = 1
+        amount = price * quantity
+        total_price += amount
+        lines.append({
+            "name": med.get("name"),
+            "dosage": med.get("dosage"),
+            "frequency": med.get("frequency"),
+            "duration": med.get("duration"),
+            "price": price,
+            "quantity": quantity,
+            "amount": amount,
+        })
+    return lines, total_price
+
+
+class InvoiceTemplate:
+    """Precompiled FPDF invoice layout.
+
+    The title block and table header are compiled once into lists of
+    ``(x, y, width, text, font, align)`` operations; rendering an invoice only
+    replays them and fills in the order fields. Only the built-in Helvetica
+    font is used, so no font files are parsed per invoice.
+    """
+
+    def __init__(self):
+        self.title_ops = [
+            (MARGIN, 15, CONTENT_WIDTH, "PharmAssist Pro - Invoice", ("Helvetica", "B", 18), "C"),
+        ]
+        self.field_ops = [
+            (MARGIN, 32 + index * LINE_HEIGHT, 40, f"{label}:", ("Helvetica", "B", 10), "L", key)
+            for index, (label, key) in enumerate(HEADER_FIELDS)
+        ]
+        self.table_header_ops = []
+        x = MARGIN
+        for label, width, align in TABLE_COLUMNS:
+            self.table_header_ops.append((x, width, label, align))
+            x += width
+        self.column_x = [op[0] for op in self.table_header_ops]
+
+    def _draw(self, pdf, x, y, width, text, font, align):
+        pdf.set_font(*font)
+        pdf.set_xy(x, y)
+        pdf.cell(width, LINE_HEIGHT, _latin1(text), align=align)
+
+    def _table_header(self, pdf, y):
+        pdf.set_font("Helvetica", "B", 9)
+        for x, width, label, align in self.table_header_ops:
+            pdf.set_xy(x, y)
+            pdf.cell(width, LINE_HEIGHT, label, border="B", align=align)
+        return y + LINE_HEIGHT + 1
+
+    def render(self, order):
+        # fpdf2 is only loaded once the first invoice is rendered
+        from fpdf import FPDF
+        pdf = FPDF(format="A4")
+        pdf.set_auto_page_break(False)
+        pdf.add_page()
+
+        for op in self.title_ops:
+            self._draw(pdf, *op)
+        for x, y, width, label, font, align, key in self.field_ops:
+            self._draw(pdf, x, y, width, label, font, align)
+            self._draw(pdf, x + width, y, CONTENT_WIDTH - width, order.get(key) or "N/A", ("Helvetica", "", 10), "L")
+
+        lines, total_price = invoice_lines(order)
+        y = self._table_header(pdf, TABLE_TOP)
+        pdf.set_font("Helvetica", "", 9)
+        for line in lines:
+            if y > PAGE_BOTTOM:
+                pdf.add_page()
+                y = self._table_header(pdf, MARGIN)
+                pdf.set_font("Helvetica", "", 9)
+            values = [
+                line["name"], line["dosage"], line["frequency"], line["duration"],
+                f"${line['price']:.2f}", line["quantity"], f"${line['amount']:.2f}",
+            ]
+            for (x, width, _label, align), value in zip(self.table_header_ops, values):
+                pdf.set_xy(x, y)
+                pdf.cell(width, LINE_HEIGHT, _latin1(value if value is not None else "N/A")[:40], align=align)
+            y += LINE_HEIGHT
+
+        pdf.set_font("Helvetica", "B", 11)
+        pdf.set_xy(MARGIN, y + LINE_HEIGHT)
+        pdf.cell(CONTENT_WIDTH, LINE_HEIGHT, f"Total Price: ${total_price:.2f}", border="T", align="R")
+        return bytes(pdf.output())
+
+
+class _ChunkWriter(io.RawIOBase):
+    # Unseekable sink that lets zipfile write straight into response chunks
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_invoice_zip(orders, render):
+    """Yield a ZIP archive of rendered invoices chunk by chunk.
+
+    ``orders`` may be any iterable, so only one invoice is held in memory
+    at a time. PDFs are already compressed and are stored uncompressed.
+    """
+    sink = _ChunkWriter()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for order in orders:
+            archive.writestr(f"invoice_{order['order_id']}.pdf", render(order))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
@@ -0,0 +1,127 @@
+import contextvars
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.status = "queued"
+        self.progress = "queued"
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.future = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "progress": self.progress,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class ExtractionJobQueue:
+    """Bounded background worker pool for extraction jobs.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queued`` wait
+    behind them; further submissions raise QueueFullError.
+    """
+
+    def __init__(self, max_workers=2, max_queued=8, result_ttl=3600):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.jobs = {}
+        self._active = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="extract-job")
+
+    def submit(self, func, *args):
+        with self._lock:
+            self._prune()
+            if self._active >= self.max_workers + self.max_queued:
+                raise QueueFullError("Extraction queue is full, retry later")
+            self._active += 1
+            job = Job(str(uuid.uuid4()))
+            self.jobs[job.job_id] = job
+        try:
+            # Carry the request id into the worker thread's log records
+            context = contextvars.copy_context()
+            job.future = self._executor.submit(context.run, self._run, job, func, args)
+        except Exception:
+            with self._lock:
+                self._active -= 1
+                self.jobs.pop(job.job_id, None)
+            raise
+        return job
+
+    def completed(self, result):
+        # Record a job whose result is already known, e.g. from a cache
+        job = Job(str(uuid.uuid4()))
+        job.status = job.progress = "done"
+        job.started_at = job.finished_at = job.submitted_at
+        job.result = result
+        with self._lock:
+            self._prune()
+            self.jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": self._active,
+                "capacity": self.max_workers + self.max_queued,
+                "tracked_jobs": len(self.jobs),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job, func, args):
+        job.status = "running"
+        job.started_at = time.time()
+
+        def report(progress):
+            job.progress = progress
+
+        try:
+            job.result = func(*args, report=report)
+            job.status = "done"
+            job.progress = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            job.progress = "failed"
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._active -= 1
+        return job.result
+
+    def _prune(self):
+        # Forget finished jobs whose results have not been collected in time
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
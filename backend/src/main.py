@@ -1,79 +1,422 @@
-from fastapi import FastAPI, Form, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Form, UploadFile, File, HTTPException, Query, Header, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from starlette.background import BackgroundTask
+from contextlib import asynccontextmanager
+import asyncio
+import io
 import uvicorn
-from extractor import extract
-import uuid
+from extractor import extract_document, shutdown_ocr_pool, warm_up, OCR_CONFIG_VERSION
 import os
+import re
+import json
+import uuid
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
 from pathlib import Path
-from order_manager import OrderManager
-import pandas as pd
+from typing import Optional
+from order_manager import OrderManager, InvalidOrderError
+from job_queue import ExtractionJobQueue, QueueFullError
+from ocr_cache import ResultCache
+from ingest import ingest_file, UploadTooLargeError, UnsupportedFormatError, MAX_UPLOAD_BYTES
+from batch_ingest import Checkpoint, run_batch
+from medicine_catalog import get_catalog
+from compliance import DUPLICATE_WINDOW_DAYS
+from order_status import InvalidTransitionError, STATUSES, TRANSITIONS
+from invoice_renderer import UNIT_PRICE
+import telemetry
+
+def prepare():
+    # Map the medicine catalog, load OCR engines and start the OCR workers
+    get_catalog()
+    warm_up()
+
+startup_task = None
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warm up in the background so the server listens immediately; /ready
+    # tells load balancers when it can take traffic
+    global startup_task
+    startup_task = asyncio.ensure_future(run_in_threadpool(prepare))
+    yield
+    # Stop the extraction workers and OCR processes on shutdown
+    await asyncio.gather(startup_task, return_exceptions=True)
+    extraction_jobs.shutdown()
+    shutdown_ocr_pool()
+    order_manager.events.close()
+    order_manager.writer.close()
+
+class RequestTooLarge(Exception):
+    pass
+
+class UploadSizeLimit:
+    """Reject oversized upload requests before their body is parsed.
+
+    Requests to the upload routes are refused with 413 from Content-Length
+    when it is sent, and otherwise as soon as the streamed body passes the
+    limit, so an oversized upload is never spooled in full.
+    """
+
+    def __init__(self, app, paths, max_bytes, overhead=64 * 1024):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+        # Room for the multipart boundaries and form fields around the file
+        self.max_body = max_bytes + overhead
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body:
+            return await self.reject(send)
+
+        received = 0
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    raise RequestTooLarge()
+            return message
+
+        async def limited_send(message):
+            # The route may turn the aborted body read into its own error
+            # response; answer 413 in its place
+            nonlocal rejected
+            if received <= self.max_body:
+                await send(message)
+            elif message["type"] == "http.response.start" and not rejected:
+                rejected = True
+                await self.reject(send)
+
+        try:
+            await self.app(scope, limited_receive, limited_send)
+        except RequestTooLarge:
+            if not rejected:
+                rejected = True
+                await self.reject(send)
+
+    async def reject(self, send):
+        body = json.dumps({"detail": f"Upload exceeds the {self.max_bytes} byte limit"}).encode()
+        await send({
+            "type": "http.response.start", "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
 
 # Initialize FastAPI app
-app = FastAPI()
+telemetry.configure_logging()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(UploadSizeLimit, paths=("/extract_from_doc", "/extract_jobs"), max_bytes=MAX_UPLOAD_BYTES)
 order_manager = OrderManager()
+extraction_jobs = ExtractionJobQueue(
+    max_workers=int(os.environ.get("EXTRACT_JOB_WORKERS", 2)),
+    max_queued=int(os.environ.get("EXTRACT_JOB_QUEUE_SIZE", 8)),
+)
+result_cache = ResultCache(
+    max_entries=int(os.environ.get("OCR_CACHE_SIZE", 256)),
+    disk_dir=os.environ.get("OCR_CACHE_DIR"),
+    max_disk_bytes=int(os.environ.get("OCR_CACHE_DISK_BYTES", 256 * 1024 * 1024)),
+)
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    # Tag every log record of the request with an id, reusing the caller's if sent
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = telemetry.request_id_var.set(request_id)
+    if not telemetry.METRICS_ENABLED:
+        try:
+            response = await call_next(request)
+        finally:
+            telemetry.request_id_var.reset(token)
+        response.headers["X-Request-ID"] = request_id
+        return response
+
+    telemetry.registry.inc("pharmassist_http_requests_in_flight", 1, help_text="HTTP requests being served", kind="gauge")
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        seconds = time.perf_counter() - start
+        telemetry.registry.inc("pharmassist_http_requests_in_flight", -1, kind="gauge")
+        # Label by route template, not the raw path, to keep the series count bounded
+        route = request.scope.get("route")
+        labels = (("method", request.method), ("route", route.path if route else "unmatched"))
+        telemetry.registry.observe("pharmassist_http_request_duration_seconds", seconds, labels, "HTTP request latency")
+        telemetry.registry.inc(
+            "pharmassist_http_requests_total", 1, labels + (("status", status_code),), "HTTP requests served"
+        )
+        telemetry.logger.info("request finished", extra={
+            "method": request.method, "path": request.url.path,
+            "status_code": status_code, "duration_ms": round(seconds * 1000, 3),
+        })
+        telemetry.request_id_var.reset(token)
+
+def validate_medicines(data):
+    # Validate medicines against CSV, suggesting close catalog names. Every
+    # medicine also carries what the UI displays, so clients need no catalog.
+    # Names the parser fuzzy-corrected are listed in corrected_meds so the
+    # pharmacist confirms them; they are never reported as plain matches.
+    invalid_meds = []
+    corrected_meds = []
+    medicine_catalog = get_catalog()
+    for med in data.get("medicines", []):
+        known = medicine_catalog.is_known(med['name'])
+        med["in_catalog"] = known
+        med["unit_price"] = UNIT_PRICE
+        score = med.get("match_score")
+        if score is not None and score < 1.0:
+            med["needs_confirmation"] = True
+            corrected_meds.append({
+                "name": med['name'],
+                "ocr_name": med.get("ocr_name"),
+                "score": score,
+            })
+        if not known:
+            invalid_meds.append({
+                "name": med['name'],
+                "suggestions": [candidate["name"].capitalize() for candidate in medicine_catalog.suggest(med['name'])]
+            })
+    
+    data["invalid_meds"] = invalid_meds
+    data["corrected_meds"] = corrected_meds
+    return data
+
+def process_upload(document, file_format, cache_key, report=lambda progress: None):
+    # Extract data from the document, always releasing its buffer; errors
+    # propagate so the job is marked failed
+    try:
+        report("ocr")
+        data = extract_document(document, file_format)
+        result_cache.put(cache_key, data)
+
+        report("validating")
+        validate_medicines(data)
+    except Exception:
+        telemetry.logger.exception("Extraction failed")
+        raise
+    finally:
+        document.close()
+
+    return data
 
-# Load medicine database
-MEDICINE_DB_PATH = Path(__file__).resolve().parent.parent / "Medicine_Details.csv"
-try:
-    medicine_df = pd.read_csv(MEDICINE_DB_PATH)
-except FileNotFoundError:
-    print("Medicine database not found. Please ensure 'Medicine_Details.csv' is in the backend directory.")
-    medicine_df = pd.DataFrame(columns=["Medicine Name", "Composition", "Manufacturer", "Side_effects"])
+def cached_extraction(cache_key):
+    data = result_cache.get(cache_key)
+    if data is not None:
+        validate_medicines(data)
+    return data
 
-# Get the absolute path to the project root directory
-BASE_DIR = Path(__file__).resolve().parent.parent  # Points to the 'backend' directory
-UPLOADS_DIR = BASE_DIR / "uploads"  # Absolute path to the 'uploads' directory
+def read_upload(file):
+    # The document takes over the file Starlette already spooled the upload
+    # into, so the bytes are not copied a second time
+    try:
+        document = ingest_file(file.file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedFormatError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    # FastAPI closes the request's files when it finishes; jobs may still be reading this one
+    file.file = io.BytesIO()
+    return document
 
-# Create the 'uploads' directory if it doesn't exist
-UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+async def lookup_upload(file, file_format):
+    # Returns (document, cache_key, cached_result); the document is closed on a hit
+    document = await run_in_threadpool(read_upload, file)
+    cache_key = result_cache.key_for(document.sha256, file_format, OCR_CONFIG_VERSION)
+    data = await run_in_threadpool(cached_extraction, cache_key)
+    if data is not None:
+        document.close()
+    return document, cache_key, data
+
+def submit_extraction(document, file_format, cache_key):
+    try:
+        return extraction_jobs.submit(process_upload, document, file_format, cache_key)
+    except QueueFullError as e:
+        document.close()
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
 
 @app.post("/extract_from_doc")
-def extract_from_doc(
+async def extract_from_doc(
     file: UploadFile = File(...),
     file_format: str = Form(...)
 ):
-    # Read the file content
-    content = file.file.read()
+    # Repeated uploads of the same document are answered from the cache
+    document, cache_key, data = await lookup_upload(file, file_format)
+    if data is not None:
+        return data
+
+    # Run through the job queue so OCR never occupies the request threadpool
+    job = submit_extraction(document, file_format, cache_key)
+    await asyncio.wrap_future(job.future)
+    if job.status == "failed":
+        return {'error': job.error}
+    return job.result
+
+@app.post("/extract_jobs", status_code=202)
+async def submit_extract_job(
+    file: UploadFile = File(...),
+    file_format: str = Form(...)
+):
+    document, cache_key, data = await lookup_upload(file, file_format)
+    if data is not None:
+        job = extraction_jobs.completed(data)
+    else:
+        job = submit_extraction(document, file_format, cache_key)
+    return {"job_id": job.job_id, "status": job.status}
+
+@app.get("/extract_jobs/{job_id}")
+def extract_job_status(job_id: str):
+    job = extraction_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+BATCH_DIR = Path(__file__).resolve().parent.parent / "batches"
+BATCH_MAX_WORKERS = int(os.environ.get("BATCH_MAX_WORKERS", 4))
+# Batches run beside the interactive job queue, so their number is capped too
+BATCH_MAX_CONCURRENT = int(os.environ.get("BATCH_MAX_CONCURRENT", 1))
+batch_slots = threading.BoundedSemaphore(BATCH_MAX_CONCURRENT)
+
+class BatchSlot:
+    """One of the BATCH_MAX_CONCURRENT slots, released exactly once."""
+
+    def __init__(self):
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        batch_slots.release()
 
-    # Generate a unique file name
-    FILE_PATH = UPLOADS_DIR / f"{uuid.uuid4()}.pdf"
+def extract_batch_item(document, file_format):
+    # Same result cache and catalog validation as /extract_from_doc
+    cache_key = result_cache.key_for(document.sha256, file_format, OCR_CONFIG_VERSION)
+    data = cached_extraction(cache_key)
+    if data is None:
+        data = extract_document(document, file_format)
+        result_cache.put(cache_key, data)
+        validate_medicines(data)
+    return data
 
-    # Save the uploaded file to the 'uploads' directory
+def stream_batch(archive_path, batch_id, file_format, workers, create_orders, slot):
+    # Runs as the response body; the uploaded archive is removed when done
     try:
-        with open(FILE_PATH, "wb") as f:
-            f.write(content)
-    except Exception as e:
-        return {"error": f"Failed to save the file: {str(e)}"}
+        checkpoint = Checkpoint(BATCH_DIR / f"{batch_id}.ckpt")
+        yield json.dumps({"batch_id": batch_id}) + "\n"
+        results = run_batch(
+            archive_path,
+            file_format=file_format,
+            workers=workers,
+            checkpoint=checkpoint,
+            order_manager=order_manager if create_orders else None,
+            extract=extract_batch_item
+        )
+        for result in results:
+            yield json.dumps(result) + "\n"
+    finally:
+        finish_batch(archive_path, slot)
+
+def finish_batch(archive_path, slot):
+    # Called by the stream and again as a background task, in case the
+    # client disconnected before the stream started
+    Path(archive_path).unlink(missing_ok=True)
+    slot.release()
+
+@app.post("/batch_extract")
+def batch_extract(
+    file: UploadFile = File(...),
+    file_format: str = Form("prescription"),
+    batch_id: Optional[str] = Form(None),
+    workers: int = Form(2),
+    create_orders: bool = Form(False)
+):
+    # Re-posting with the same batch_id resumes from its checkpoint
+    batch_id = batch_id or str(uuid.uuid4())
+    if not re.fullmatch(r"[\w-]+", batch_id):
+        raise HTTPException(status_code=400, detail="Invalid batch_id")
+    if not batch_slots.acquire(blocking=False):
+        raise HTTPException(status_code=429, detail="Too many batches running, retry later", headers={"Retry-After": "30"})
+    slot = BatchSlot()
 
-    # Extract data from the file
     try:
-        data = extract(FILE_PATH, file_format)
-        
-        # Validate medicines against CSV
-        invalid_meds = []
-        for med in data.get("medicines", []):
-            if not medicine_df['Medicine Name'].str.contains(med['name'], case=False).any():
-                invalid_meds.append(med['name'])
-        
-        data["invalid_meds"] = invalid_meds
-
-    except Exception as e:
-        data = {
-            'error': str(e)
-        }
-
-    # Delete the file after processing
-    if os.path.exists(FILE_PATH):
-        os.remove(FILE_PATH)
+        BATCH_DIR.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(suffix=".zip", dir=BATCH_DIR, delete=False) as f:
+            shutil.copyfileobj(file.file, f)
+            archive_path = f.name
+    except Exception:
+        slot.release()
+        raise
+    if not zipfile.is_zipfile(archive_path):
+        finish_batch(archive_path, slot)
+        raise HTTPException(status_code=415, detail="Expected a ZIP archive of PDFs/images")
 
-    return data
+    workers = min(max(workers, 1), BATCH_MAX_WORKERS)
+    return StreamingResponse(
+        stream_batch(archive_path, batch_id, file_format, workers, create_orders, slot),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(finish_batch, archive_path, slot)
+    )
+
+@app.get("/cache_stats")
+def cache_stats():
+    return result_cache.stats()
+
+@app.get("/ready")
+def ready(response: Response):
+    if startup_task is None or not startup_task.done():
+        response.status_code = 503
+        return {"status": "starting"}
+    if startup_task.exception() is not None:
+        response.status_code = 503
+        return {"status": "failed", "error": str(startup_task.exception())}
+    return {"status": "ready"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Queue and cache state is sampled at scrape time
+    for name, value in extraction_jobs.stats().items():
+        telemetry.registry.set(f"pharmassist_extract_jobs_{name}", value, help_text=f"Extraction job queue {name}")
+    for name, value in result_cache.stats().items():
+        telemetry.registry.set(f"pharmassist_result_cache_{name}", value, help_text=f"Extraction result cache {name}")
+    return PlainTextResponse(telemetry.render_metrics(), media_type="text/plain; version=0.0.4")
 
 # ... (rest of the code remains unchanged)
 
 @app.post("/generate_order")
-def generate_order(order_data: dict):
-    order_id = order_manager.generate_order(order_data)
-    return {"order_id": order_id}
+async def generate_order(order_data: dict, idempotency_key: Optional[str] = Header(None)):
+    # Retries carrying the same Idempotency-Key get the original order back
+    try:
+        future = order_manager.submit_order(order_data, idempotency_key)
+    except InvalidOrderError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    order_id = await asyncio.wrap_future(future)
+    duplicates = await run_in_threadpool(
+        order_manager.find_duplicate_prescriptions, order_data, exclude_order_id=order_id
+    )
+    return {"order_id": order_id, "duplicate_prescriptions": duplicates}
+
+@app.post("/check_duplicates")
+def check_duplicates(order_data: dict, window_days: int = Query(DUPLICATE_WINDOW_DAYS, ge=1, le=3650)):
+    # Same patient and medicine prescribed again within the window
+    duplicates = order_manager.find_duplicate_prescriptions(order_data, window_days=window_days)
+    return {"duplicate_prescriptions": duplicates}
 
 @app.get("/track_order/{order_id}")
 def track_order(order_id: str):
@@ -83,16 +426,188 @@ def track_order(order_id: str):
     return order
 
 @app.get("/order_history")
-def order_history():
-    history = order_manager.get_order_history()
+def order_history(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    patient_name: Optional[str] = None,
+    doctor_name: Optional[str] = None,
+    status: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_invoice: bool = False
+):
+    filters = {
+        "date_from": date_from,
+        "date_to": date_to,
+        "patient_name": patient_name,
+        "doctor_name": doctor_name,
+        "status": status
+    }
+    try:
+        history = order_manager.get_order_history(
+            filters=filters,
+            cursor=cursor,
+            limit=limit,
+            fields=[field.strip() for field in fields.split(",")] if fields else None,
+            include_invoice=include_invoice
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return history
 
+@app.get("/order_statuses")
+def order_statuses():
+    # The lifecycle in order, with the moves allowed from each status
+    return {"statuses": STATUSES, "transitions": {status: sorted(TRANSITIONS[status]) for status in STATUSES}}
+
+@app.post("/update_order_status/{order_id}")
+def update_order_status(order_id: str, update: dict):
+    if not update.get("status"):
+        raise HTTPException(status_code=400, detail="status is required")
+    try:
+        order = order_manager.update_status(order_id, update["status"], update.get("expected_version"))
+    except InvalidTransitionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order
+
+# Server-sent events: idle streams get a comment line this often, and a
+# client that falls this many events behind is disconnected to resume
+ORDER_EVENT_HEARTBEAT_SECONDS = 15
+ORDER_EVENT_QUEUE_SIZE = 256
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: status\ndata: {json.dumps(event)}\n\n"
+
+@app.get("/order_events")
+async def order_events(
+    order_id: Optional[str] = None,
+    status: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None)
+):
+    # Status changes are pushed as they happen; reconnecting clients send
+    # Last-Event-ID and get the events they missed replayed first
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue(maxsize=ORDER_EVENT_QUEUE_SIZE)
+    overflowed = asyncio.Event()
+
+    def enqueue(event):
+        try:
+            events.put_nowait(event)
+        except asyncio.QueueFull:
+            overflowed.set()
+
+    def deliver(event):
+        # Runs on the thread that changed the order
+        loop.call_soon_threadsafe(enqueue, event)
+
+    def wanted(event):
+        return (order_id is None or event["order_id"] == order_id) and (status is None or event["status"] == status)
+
+    # An id from before a restart (another epoch) cannot be resumed from;
+    # the client just gets live events
+    last_sent = order_manager.events.parse_id(last_event_id) or 0
+    unsubscribe = order_manager.events.subscribe(deliver)
+    missed = order_manager.events.events_since(last_sent) if last_sent else []
+
+    async def stream():
+        nonlocal last_sent
+        try:
+            yield "retry: 3000\n\n"
+            for event in missed:
+                last_sent = event["seq"]
+                if wanted(event):
+                    yield format_event(event)
+            while not overflowed.is_set():
+                try:
+                    event = await asyncio.wait_for(events.get(), ORDER_EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event["seq"] <= last_sent:
+                    continue
+                last_sent = event["seq"]
+                if wanted(event):
+                    yield format_event(event)
+        finally:
+            unsubscribe()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/patient_history")
+def patient_history(
+    patient_name: str,
+    days: int = Query(90, ge=1, le=3650),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    include_invoice: bool = False
+):
+    try:
+        return order_manager.get_patient_history(
+            patient_name, days=days, cursor=cursor, limit=limit, include_invoice=include_invoice
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/compliance_register")
+def compliance_register(
+    doctor_name: Optional[str] = None,
+    patient_name: Optional[str] = None,
+    medicine: Optional[str] = None,
+    controlled_only: bool = True,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None
+):
+    filters = {
+        "doctor_name": doctor_name,
+        "patient_name": patient_name,
+        "medicine": medicine,
+        "date_from": date_from,
+        "date_to": date_to
+    }
+    try:
+        return order_manager.get_compliance_register(
+            filters, cursor=cursor, limit=limit, controlled_only=controlled_only
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/download_invoice/{order_id}")
-def download_invoice(order_id: str):
-    invoice_path = order_manager.generate_invoice(order_id)
-    if not invoice_path or not invoice_path.exists():
+def download_invoice(order_id: str, if_none_match: Optional[str] = Header(None)):
+    order = order_manager.track_order(order_id)
+    if not order:
         raise HTTPException(status_code=404, detail="Invoice not found")
-    return FileResponse(invoice_path, filename=f"invoice_{order_id}.txt")
+
+    # Clients holding the current version get a 304 without any rendering
+    etag = order_manager.invoice_etag(order)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    content = order_manager.get_invoice(order)
+    headers["Content-Disposition"] = f'attachment; filename="invoice_{order_id}.pdf"'
+    return Response(content, media_type="application/pdf", headers=headers)
+
+@app.get("/export_invoices")
+def export_invoices(date_from: str, date_to: str):
+    try:
+        archive = order_manager.export_invoices({"date_from": date_from, "date_to": date_to})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    filename = f"invoices_{date_from[:10]}_{date_to[:10]}.zip"
+    return StreamingResponse(
+        archive,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @app.post("/submit_support_request")
 def submit_support_request(request_data: dict):
@@ -0,0 +1,245 @@
+import argparse
+import csv
+import json
+import os
+import re
+import threading
+from pathlib import Path
+import telemetry
+from catalog_store import CatalogFormatError, MappedCatalog, write_catalog
+from fuzzy_matcher import TrigramMatcher, catalog_terms
+
+# Load medicine database from CSV
+MEDICINE_DB_PATH = Path(__file__).resolve().parent.parent / "Medicine_Details.csv"
+# Precompiled copy of the CSV, rebuilt whenever the CSV changes
+CATALOG_BIN_PATH = Path(os.environ.get("CATALOG_BIN_PATH", MEDICINE_DB_PATH.with_suffix(".catalog")))
+MOCK_MEDICINES_PATH = Path(__file__).resolve().parent / "mock_medicines.json"
+CATALOG_COLUMNS = ["Medicine Name", "Composition", "Manufacturer", "Side_effects"]
+
+# Token prefixes shorter than this are not indexed (too many rows per key)
+MIN_PREFIX = 2
+MAX_PREFIX = 12
+
+# Names shorter than this only match whole words, never substrings
+MIN_SUBSTRING_MATCH = 4
+# Fuzzy matches must be at least this similar to replace an OCR'd name
+FUZZY_MIN_SCORE = 0.75
+
+_WHITESPACE = re.compile(r"\s+")
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_name(name):
+    return _WHITESPACE.sub(" ", str(name)).strip().lower()
+
+
+class MedicineCatalog:
+    """Indexed, read-only view of the medicine database.
+
+    ``find`` has the same semantics as the old
+    ``medicine_df['Medicine Name'].str.contains(name, case=False)`` lookup
+    (first catalog row whose name contains ``name``, matched from the start
+    of a word) but resolves through a normalized-name hash index and a token
+    prefix index instead of scanning every row. The same tables can be
+    memory-mapped from a precompiled catalog file (``from_binary``) instead
+    of being built from the CSV.
+    """
+
+    def __init__(self, records, extra_names=()):
+        self._setup(records, extra_names)
+        self.names = [normalize_name(record["Medicine Name"]) for record in records]
+        self.by_name = {}
+        self.prefix_index = {}
+        for row, name in enumerate(self.names):
+            self.by_name.setdefault(name, row)
+            for token in set(_TOKEN.findall(name)):
+                for length in range(MIN_PREFIX, min(len(token), MAX_PREFIX) + 1):
+                    postings = self.prefix_index.setdefault(token[:length], [])
+                    # Rows are added in order, so postings stay sorted
+                    if not postings or postings[-1] != row:
+                        postings.append(row)
+
+    def _setup(self, records, extra_names):
+        self.records = records
+        self.extra_names = list(extra_names)
+        self._matcher = None
+        self._matcher_lock = threading.Lock()
+
+    @classmethod
+    def from_csv(cls, path=MEDICINE_DB_PATH):
+        try:
+            records = read_csv_records(path)
+        except FileNotFoundError:
+            telemetry.logger.error("Medicine database not found. Please ensure 'Medicine_Details.csv' is in the backend directory.")
+            records = []
+        return cls(records, load_mock_medicines())
+
+    @classmethod
+    def from_binary(cls, path=CATALOG_BIN_PATH):
+        return cls.from_mapped(MappedCatalog(path))
+
+    @classmethod
+    def from_mapped(cls, mapped):
+        # Tables stay in the mapped file; nothing is indexed at load time
+        catalog = cls.__new__(cls)
+        catalog._setup(mapped.records, load_mock_medicines())
+        catalog.names = mapped.names
+        catalog.by_name = mapped.by_name
+        catalog.prefix_index = mapped.prefix_index
+        return catalog
+
+    def save(self, path=CATALOG_BIN_PATH, source_stat=None):
+        write_catalog(path, CATALOG_COLUMNS, self.records, self.names, self.prefix_index, source_stat)
+
+    def __len__(self):
+        return len(self.records)
+
+    @telemetry.timed("catalog_find")
+    def find_row(self, name):
+        query = normalize_name(name)
+        if not query:
+            return None
+        tokens = _TOKEN.findall(query)
+        first_token = tokens[0] if tokens else ""
+        if len(first_token) < MIN_PREFIX or not query.startswith(first_token):
+            candidates = range(len(self.names))
+        else:
+            candidates = self.prefix_index.get(first_token[:MAX_PREFIX], [])
+            # Whole-name hits are the common case and need no verification
+            exact_row = self.by_name.get(query)
+            if exact_row is not None and (not candidates or candidates[0] == exact_row):
+                return exact_row
+        for row in candidates:
+            if query in self.names[row]:
+                return row
+        return None
+
+    def find(self, name):
+        row = self.find_row(name)
+        if row is None:
+            return None
+        return self.records[row]
+
+    def contains(self, name):
+        return self.find_row(name) is not None
+
+    def details(self, name):
+        record = self.find(name)
+        if record is None:
+            return None
+        return {
+            "composition": record["Composition"],
+            "manufacturer": record["Manufacturer"],
+            "side_effects": record["Side_effects"],
+        }
+
+    @property
+    def matcher(self):
+        # The trigram index is only needed for OCR misses, so build it lazily
+        if self._matcher is None:
+            with self._matcher_lock:
+                if self._matcher is None:
+                    self._matcher = TrigramMatcher(list(catalog_terms(self.names)) + self.extra_names)
+        return self._matcher
+
+    def is_known(self, name):
+        return self.contains(name) or name in self.matcher
+
+    def suggest(self, name, k=5):
+        return self.matcher.search(normalize_name(name), k=k)
+
+    @telemetry.timed("catalog_match")
+    def match(self, name):
+        """Resolve an OCR'd medicine name to ``(name, record, score)``.
+
+        Tries an exact name, then a word-prefix substring match, then the
+        closest fuzzy candidate. ``record`` is None for names that are only
+        known from the mock medicine list. Returns None when nothing is close.
+        """
+        query = normalize_name(name)
+        if not query:
+            return None
+        row = self.by_name.get(query)
+        if row is None and len(query) >= MIN_SUBSTRING_MATCH:
+            row = self.find_row(query)
+        if row is not None:
+            return name, self.records[row], 1.0
+        if query in self.matcher:
+            return name, self.find(query), 1.0
+
+        candidates = self.suggest(query, k=1)
+        if not candidates or candidates[0]["score"] < FUZZY_MIN_SCORE:
+            return None
+        best = candidates[0]["name"]
+        return best, self.find(best), candidates[0]["score"]
+
+
+def read_csv_records(path):
+    # Rows without a name are dropped and empty cells read as "N/A"
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return [
+            {column: row.get(column) or "N/A" for column in CATALOG_COLUMNS}
+            for row in csv.DictReader(f)
+            if row.get("Medicine Name")
+        ]
+
+
+def load_catalog(csv_path=MEDICINE_DB_PATH, bin_path=CATALOG_BIN_PATH):
+    """Map the precompiled catalog, rebuilding it first if the CSV changed."""
+    try:
+        source_stat = os.stat(csv_path)
+    except FileNotFoundError:
+        source_stat = None
+    try:
+        mapped = MappedCatalog(bin_path)
+        if source_stat is None or mapped.built_from(source_stat):
+            return MedicineCatalog.from_mapped(mapped)
+    except (FileNotFoundError, CatalogFormatError):
+        pass
+
+    catalog = MedicineCatalog.from_csv(csv_path)
+    if source_stat is None:
+        return catalog
+    try:
+        catalog.save(bin_path, source_stat)
+    except OSError as e:
+        telemetry.logger.warning("Could not write the precompiled catalog: %s", e)
+        return catalog
+    return MedicineCatalog.from_binary(bin_path)
+
+
+def load_mock_medicines(path=MOCK_MEDICINES_PATH):
+    try:
+        with open(path, "r") as f:
+            return json.load(f).get("medicines", [])
+    except FileNotFoundError:
+        return []
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    # Shared instance, loaded once per process on first use
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = load_catalog()
+    return _catalog
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompile the medicine CSV into a memory-mappable catalog.")
+    parser.add_argument("--csv", type=Path, default=MEDICINE_DB_PATH)
+    parser.add_argument("--output", type=Path, default=CATALOG_BIN_PATH)
+    args = parser.parse_args(argv)
+
+    catalog = MedicineCatalog.from_csv(args.csv)
+    catalog.save(args.output, os.stat(args.csv))
+    print(f"Wrote {len(catalog)} medicines to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU mapping with an entry limit."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            return self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ResultCache:
+    """Content-addressed cache for extraction results.
+
+    Entries are keyed on the SHA-256 digest of the uploaded bytes plus the
+    OCR configuration version. Results are stored as JSON so callers always
+    get a private copy. An optional on-disk tier keeps results across restarts
+    and evicts least recently used files once ``max_disk_bytes`` is exceeded.
+    """
+
+    def __init__(self, max_entries=256, disk_dir=None, max_disk_bytes=256 * 1024 * 1024):
+        self.memory = LRUCache(max_entries)
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.disk_evictions = 0
+        self._disk_lock = threading.Lock()
+        # Counters are bumped from request threads and pool callbacks
+        self._stats_lock = threading.Lock()
+        self._disk_bytes = 0
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(path.stat().st_size for path in self.disk_dir.glob("*.json"))
+
+    @staticmethod
+    def key_for(content_sha256, *parts):
+        digest = hashlib.sha256(content_sha256.encode("ascii"))
+        for part in parts:
+            digest.update(b"\0" + str(part).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        payload = self.memory.get(key)
+        if payload is None and self.disk_dir:
+            payload = self._disk_get(key)
+            if payload is not None:
+                self._count("disk_hits")
+                self.memory.put(key, payload)
+        if payload is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return json.loads(payload)
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def put(self, key, value):
+        payload = json.dumps(value).encode("utf-8")
+        self.memory.put(key, payload)
+        if self.disk_dir:
+            self._disk_put(key, payload)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "memory_entries": len(self.memory),
+            "memory_evictions": self.memory.evictions,
+            "disk_bytes": self._disk_bytes,
+            "disk_evictions": self.disk_evictions,
+        }
+
+    def _disk_path(self, key):
+        return self.disk_dir / f"{key}.json"
+
+    def _disk_get(self, key):
+        path = self._disk_path(key)
+        try:
+            payload = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        # Refresh the modification time so eviction stays least-recently-used.
+        # Another thread may have evicted the file since it was read.
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return payload
+
+    def _disk_put(self, key, payload):
+        path = self._disk_path(key)
+        tmp_path = path.with_suffix(".tmp")
+        with self._disk_lock:
+            previous = path.stat().st_size if path.exists() else 0
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+            self._disk_bytes += len(payload) - previous
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self):
+        files = sorted(self.disk_dir.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        for path in files:
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            size = path.stat().st_size
+            path.unlink(missing_ok=True)
+            self._disk_bytes -= size
+            self.disk_evictions += 1
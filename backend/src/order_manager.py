@@ -1,106 +1,314 @@
+import base64
+import os
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 import json
-import pandas as pd
-from fpdf import FPDF
+import telemetry
+from compliance import DUPLICATE_WINDOW_DAYS, load_controlled_substances, normalize_key, order_items
+from order_store import SQLiteOrderStore
+from order_writer import OrderWriter
+from order_status import InvalidTransitionError, OrderEventBus, check_transition
+from ocr_cache import LRUCache
+from medicine_catalog import get_catalog
+from invoice_renderer import InvoiceTemplate, parse_quantity, stream_invoice_zip
+
+# Bump when the invoice layout changes so cached copies are not reused
+INVOICE_TEMPLATE_VERSION = 3
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+DATE_FORMAT = "%Y-%m-%d"
+ORDER_CURSOR_FIELDS = ("timestamp", "order_id")
+ITEM_CURSOR_FIELDS = ("timestamp", "order_id", "line", "medicine_key")
+
+def encode_cursor(record, fields=ORDER_CURSOR_FIELDS):
+    raw = json.dumps([record[field] for field in fields]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor, fields=ORDER_CURSOR_FIELDS):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise ValueError("Invalid cursor")
+    if not all(isinstance(value, (str, int)) for value in values):
+        raise ValueError("Invalid cursor")
+    return tuple(values)
+
+
+class InvalidOrderError(ValueError):
+    pass
+
+
+def normalize_medicines(medicines):
+    # Medicines come straight from client JSON; quantities end up in invoice arithmetic
+    if medicines is None:
+        return None
+    if not isinstance(medicines, list):
+        raise InvalidOrderError("medicines must be a list")
+    normalized = []
+    for index, med in enumerate(medicines):
+        if not isinstance(med, dict):
+            raise InvalidOrderError(f"medicines[{index}] must be an object, not {type(med).__name__}")
+        if "quantity" in med:
+            try:
+                med = {**med, "quantity": parse_quantity(med["quantity"])}
+            except ValueError as e:
+                raise InvalidOrderError(f"{med.get('name')}: {e}")
+        normalized.append(med)
+    return normalized
+
+
+def normalize_date(field, value):
+    """Return ``value`` as a timestamp string, or raise ValueError."""
+    for fmt in (TIMESTAMP_FORMAT, DATE_FORMAT):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        # A bare date in date_to covers the whole day
+        if fmt == DATE_FORMAT and field == "date_to":
+            parsed = parsed.replace(hour=23, minute=59, second=59)
+        return parsed.strftime(TIMESTAMP_FORMAT)
+    raise ValueError(f"{field} must be YYYY-MM-DD or YYYY-MM-DD HH:MM:SS, not {value!r}")
+
+
+def normalize_filters(filters):
+    filters = dict(filters or {})
+    for field in ("date_from", "date_to"):
+        if filters.get(field):
+            filters[field] = normalize_date(field, filters[field])
+    # Names match whatever their case or spacing, like the patient index
+    for name, key in (("patient_name", "patient_key"), ("doctor_name", "doctor_key")):
+        if name in filters:
+            filters[key] = normalize_key(filters.pop(name))
+    return filters
+
 
 class OrderManager:
-    def __init__(self):
-        self.orders = {}
-        self.invoice_dir = Path("backend/invoices")  # Correct path to backend/invoices
-        self.invoice_dir.mkdir(parents=True, exist_ok=True)  # Create invoices directory
+    def __init__(self, store=None):
+        self.invoice_template = InvoiceTemplate()
+        self.invoice_cache = LRUCache(int(os.environ.get("INVOICE_CACHE_SIZE", 1024)))
         self.patient_records_path = Path("backend/patient_records.json")
-        self.patient_records = self.load_patient_records()
+        self.controlled_substances = load_controlled_substances()
+        # Orders are persisted in SQLite unless another OrderStore is given
+        if store is None:
+            store = SQLiteOrderStore(os.environ.get("ORDER_DB_PATH", "backend/orders.sqlite3"))
+        self.store = store
+        # Status changes go through the store, so all workers sharing it see them
+        self.events = OrderEventBus(store)
+        # One-shot import of the legacy JSON records
+        self.store.migrate_json(self.patient_records_path)
+        # All new orders go through one writer thread that commits them in batches
+        self.writer = OrderWriter(
+            self.store,
+            max_batch=int(os.environ.get("ORDER_BATCH_SIZE", 64)),
+            max_delay=float(os.environ.get("ORDER_BATCH_DELAY_MS", 5)) / 1000,
+        )
 
-    def load_patient_records(self):
-        if self.patient_records_path.exists():
-            with open(self.patient_records_path, "r") as f:
-                return json.load(f)
-        return []
+    def generate_order(self, order_data, idempotency_key=None):
+        return self.submit_order(order_data, idempotency_key).result()
 
-    def save_patient_records(self):
-        with open(self.patient_records_path, "w") as f:
-            json.dump(self.patient_records, f, indent=4)
+    def submit_order(self, order_data, idempotency_key=None):
+        """Queue a new order; the returned future resolves to its id.
 
-    def generate_order(self, order_data):
+        Repeating a request with the same ``idempotency_key`` resolves to the
+        order created by the first one instead of creating another. Raises
+        InvalidOrderError for medicines that cannot be invoiced.
+        """
+        medicines = self.with_compositions(normalize_medicines(order_data.get("medicines")))
         order_id = str(uuid.uuid4())
-        self.orders[order_id] = {
+        order = {
             "order_id": order_id,
             "patient_name": order_data.get("patient_name"),
             "doctor_name": order_data.get("doctor_name"),
-            "medicines": order_data.get("medicines"),
+            "medicines": medicines,
             "status": "Pending",
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            "timestamp": datetime.now().strftime(TIMESTAMP_FORMAT)
         }
-        self.generate_invoice(order_id)
-        
+        # Invoices are rendered on first download, not here
+        return self.writer.submit(order, idempotency_key)
 
-       
-    # Generate invoice for the order
-        self.patient_records.append(self.orders[order_id])
-        self.save_patient_records()
-        return order_id
+    def with_compositions(self, medicines):
+        # Ingredient index rows are built from the composition, which orders
+        # entered by hand lack; it is looked up in the catalog
+        if not medicines:
+            return medicines
+        filled = []
+        for med in medicines:
+            if isinstance(med, dict) and med.get("name") and med.get("composition") in (None, "", "N/A"):
+                details = get_catalog().details(med["name"])
+                if details is not None:
+                    med = dict(med, composition=details["composition"])
+            filled.append(med)
+        return filled
+
+    def close(self):
+        self.events.close()
+        self.writer.close()
+        self.store.close()
 
     def track_order(self, order_id):
-        return self.orders.get(order_id, {})
-
-    def get_order_history(self):
-        return list(self.orders.values())
-
-    def generate_invoice(self, order_id):
-        order = self.orders.get(order_id)
-        if not order:
-            return None
-
-         # Invoice content
-        invoice_content = f"""
-        ==============================
-        PharmAssist Pro - Invoice
-        ==============================
-        Order ID: {order['order_id']}
-        Patient Name: {order['patient_name']}
-        Doctor Name: {order['doctor_name']}
-        Date: {order['timestamp']}
-        ------------------------------
-        Prescribed Medicines:
-        """
+        with telemetry.stage_timer("order_get"):
+            return self.store.get(order_id) or {}
 
-        total_price = 0
-        for med in order['medicines']:
-            price = 12.99  # Example price per unit
-            quantity = 1  # Example quantity
-            total_price += price * quantity
-            invoice_content += f"""
-        - {med['name']} ({med['dosage']})
-          Frequency: {med['frequency']}
-          Duration: {med['duration']}
-          Price: ${price:.2f} x {quantity} = ${price * quantity:.2f}
+    def update_status(self, order_id, status, expected_version=None):
+        """Move an order to ``status`` and notify event subscribers.
+
+        Returns the updated order, or None if it does not exist. Raises
+        InvalidTransitionError for a move the lifecycle does not allow or
+        when ``expected_version`` is given and the order has changed since.
         """
+        while True:
+            order = self.store.get(order_id)
+            if order is None:
+                return None
+            if expected_version is not None and order["version"] != expected_version:
+                raise InvalidTransitionError(
+                    f"Order {order_id} is at version {order['version']}, not {expected_version}"
+                )
+            check_transition(order["status"], status)
+            # Compare-and-set on the version so concurrent updates cannot both
+            # apply the same transition; on a lost race re-check from scratch
+            with telemetry.stage_timer("order_update"):
+                updated = self.store.update(order_id, {"status": status}, expected_version=order["version"])
+            if updated is not None:
+                self.events.publish(updated, order["status"])
+                return updated
+
+    def get_order_history(self, filters=None, cursor=None, limit=50, fields=None, include_invoice=False):
+        filters = normalize_filters(filters)
+        after = decode_cursor(cursor) if cursor else None
+        # Fetch one extra row to know whether another page exists
+        with telemetry.stage_timer("order_query"):
+            orders = self.store.query_orders(filters, after=after, limit=limit + 1)
+        next_cursor = None
+        if len(orders) > limit:
+            orders = orders[:limit]
+            next_cursor = encode_cursor(orders[-1])
+
+        page = []
+        for order in orders:
+            item = {field: order[field] for field in fields if field in order} if fields else order
+            if include_invoice:
+                item["invoice"] = self.get_invoice_metadata(order)
+            page.append(item)
+        return {"orders": page, "next_cursor": next_cursor}
+
+    def get_patient_history(self, patient_name, days=90, cursor=None, limit=50, include_invoice=False):
+        # Served from the patient index, newest first
+        patient_key = normalize_key(patient_name)
+        if patient_key is None:
+            raise ValueError("patient_name is required")
+        since = (datetime.now() - timedelta(days=days)).strftime(TIMESTAMP_FORMAT)
+        return self.get_order_history(
+            {"patient_key": patient_key, "date_from": since},
+            cursor=cursor, limit=limit, include_invoice=include_invoice
+        )
+
+    def get_compliance_register(self, filters=None, cursor=None, limit=50, controlled_only=True):
+        """Prescription lines matching ``filters``, newest first.
 
-        invoice_content += f"""
-        ------------------------------
-        Total Price: ${total_price:.2f}
-        ==============================
+        ``filters`` may hold doctor_name, patient_name, medicine, date_from
+        and date_to. With ``controlled_only`` only controlled substances are
+        listed. Returns ``{entries, next_cursor}``.
         """
+        filters = normalize_filters(filters)
+        item_filters = {
+            "date_from": filters.get("date_from"),
+            "date_to": filters.get("date_to"),
+            "doctor_key": filters.get("doctor_key"),
+            "patient_key": filters.get("patient_key"),
+        }
+        medicine_key = normalize_key(filters.get("medicine"))
+        if controlled_only:
+            keys = [medicine_key] if medicine_key else sorted(self.controlled_substances)
+            item_filters["medicine_keys"] = [key for key in keys if key in self.controlled_substances]
+        elif medicine_key:
+            item_filters["medicine_keys"] = [medicine_key]
+
+        after = decode_cursor(cursor, ITEM_CURSOR_FIELDS) if cursor else None
+        with telemetry.stage_timer("order_items_query"):
+            items = self.store.query_items(item_filters, after=after, limit=limit + 1)
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor(items[-1], ITEM_CURSOR_FIELDS)
+        return {"entries": [self.register_entry(item) for item in items], "next_cursor": next_cursor}
+
+    def register_entry(self, item):
+        return {
+            "order_id": item["order_id"],
+            "line": item["line"],
+            "timestamp": item["timestamp"],
+            "patient_name": item["patient_name"],
+            "doctor_name": item["doctor_name"],
+            "medicine": item["medicine"],
+            "dosage": item["dosage"],
+            # The generic name matched, e.g. tramadol for an Ultracet line
+            "substance": item["medicine_key"],
+            "schedule": self.controlled_substances.get(item["medicine_key"]),
+        }
+
+    def find_duplicate_prescriptions(self, order_data, window_days=DUPLICATE_WINDOW_DAYS, exclude_order_id=None):
+        """Earlier lines for the same patient and medicine within ``window_days``."""
+        medicines = order_data.get("medicines")
+        if isinstance(medicines, list):
+            medicines = self.with_compositions(medicines)
+        new_items = order_items(dict(order_data, medicines=medicines, order_id=None, timestamp=None))
+        patient_key = normalize_key(order_data.get("patient_name"))
+        if patient_key is None or not new_items:
+            return []
+        since = (datetime.now() - timedelta(days=window_days)).strftime(TIMESTAMP_FORMAT)
+        with telemetry.stage_timer("order_items_query"):
+            items = self.store.query_items({
+                "patient_key": patient_key,
+                "medicine_keys": sorted({item["medicine_key"] for item in new_items}),
+                "date_from": since,
+            }, limit=100)
+        # A line matched on both its name and an ingredient is reported once
+        lines = {}
+        for item in items:
+            if item["order_id"] != exclude_order_id:
+                lines.setdefault((item["order_id"], item["line"]), item)
+        return [self.register_entry(item) for item in lines.values()]
 
-        # Save invoice to a file
-        invoice_path = self.invoice_dir / f"invoice_{order_id}.txt"
-        with open(invoice_path, "w") as f:
-            f.write(invoice_content)
+    def get_invoice_metadata(self, order):
+        order_id = order["order_id"]
+        return {
+            "url": f"/download_invoice/{order_id}",
+            "etag": self.invoice_etag(order),
+            "filename": f"invoice_{order_id}.pdf",
+            "media_type": "application/pdf"
+        }
 
-        return invoice_path
+    def invoice_etag(self, order):
+        # The rendered invoice only depends on the order version and the template
+        return f'"{order["order_id"]}-{order.get("version", 1)}-{INVOICE_TEMPLATE_VERSION}"'
 
+    def get_invoice(self, order):
+        # Render on first request and reuse until the order changes
+        cache_key = (order["order_id"], order.get("version", 1))
+        content = self.invoice_cache.get(cache_key)
+        if content is None:
+            content = self.render_invoice(order)
+            self.invoice_cache.put(cache_key, content)
+        return content
 
-        # Save the PDF to the invoices directory
-        invoice_path = self.invoice_dir / f"invoice_{order_id}.pdf"
-        pdf.output(invoice_path)
+    @telemetry.timed("invoice_render")
+    def render_invoice(self, order):
+        return self.invoice_template.render(order)
 
-        return invoice_path
+    def iter_orders(self, filters=None, batch_size=500):
+        # Walk matching orders page by page so exports never load them all
+        after = None
+        while True:
+            orders = self.store.query_orders(filters or {}, after=after, limit=batch_size)
+            yield from orders
+            if len(orders) < batch_size:
+                return
+            after = (orders[-1]["timestamp"], orders[-1]["order_id"])
 
-    def get_invoice(self, order_id):
-        invoice_path = self.invoice_dir / f"invoice_{order_id}.txt"
-        if invoice_path.exists():
-            with open(invoice_path, "r") as f:
-                return f.read()
-        return None
\ No newline at end of file
+    def export_invoices(self, filters=None):
+        return stream_invoice_zip(self.iter_orders(normalize_filters(filters)), self.render_invoice)
@@ -0,0 +1,114 @@
+import os
+import threading
+from datetime import datetime
+import telemetry
+
+# How often events written by other processes are picked up
+ORDER_EVENT_POLL_SECONDS = float(os.environ.get("ORDER_EVENT_POLL_SECONDS", 0.5))
+
+# Order lifecycle, in order. Each status may only move to the next one.
+STATUSES = ["Pending", "Verified", "Dispensing", "Ready", "Collected"]
+TRANSITIONS = {current: {following} for current, following in zip(STATUSES, STATUSES[1:])}
+TRANSITIONS[STATUSES[-1]] = set()
+
+
+class InvalidTransitionError(ValueError):
+    pass
+
+
+def check_transition(current, new):
+    if new not in STATUSES:
+        raise InvalidTransitionError(f"Unknown status {new!r}; expected one of {', '.join(STATUSES)}")
+    if new not in TRANSITIONS.get(current, set()):
+        allowed = ", ".join(sorted(TRANSITIONS.get(current, set()))) or "none"
+        raise InvalidTransitionError(f"Cannot move an order from {current} to {new} (allowed: {allowed})")
+
+
+class OrderEventBus:
+    """Fan-out of order status changes to live subscribers.
+
+    Events are written to the order store's event log, so every process
+    using the same database (e.g. several server workers) sees them all.
+    ``publish`` delivers the new event, and any not yet delivered, before it
+    returns; a poller thread picks up events written by other processes
+    every ``poll_interval`` seconds while there are subscribers. Subscribers
+    are callables invoked with each event dict; they must not block (the SSE
+    endpoint hands events to its event loop, the simulated dispenser to a
+    queue). The last ``history`` events stay in the log so a reconnecting
+    client can resume from the id it saw last.
+
+    Event ids are ``<log>-<seq>``: ``seq`` counts up in the store and
+    ``log`` identifies the store's event log, so ids from another database
+    are not mistaken for current ones.
+    """
+
+    def __init__(self, store, history=1000, poll_interval=ORDER_EVENT_POLL_SECONDS):
+        self.store = store
+        self.history = history
+        self.poll_interval = poll_interval
+        self.epoch = store.event_log_id()
+        self._delivered = store.last_event_seq()
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._poller = None
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.add(callback)
+            if self._poller is None and not self._stop.is_set():
+                self._poller = threading.Thread(target=self._poll, name="order-events", daemon=True)
+                self._poller.start()
+        return lambda: self.unsubscribe(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._subscribers.discard(callback)
+
+    def publish(self, order, previous_status):
+        event = self.store.append_event({
+            "order_id": order["order_id"],
+            "status": order["status"],
+            "previous_status": previous_status,
+            "version": order["version"],
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }, keep=self.history)
+        self.deliver_new()
+        return self._with_id(event)
+
+    def deliver_new(self):
+        # Delivered under the lock so every subscriber sees seqs in order
+        with self._lock:
+            if not self._subscribers:
+                self._delivered = max(self._delivered, self.store.last_event_seq())
+                return
+            for event in self.store.events_after(self._delivered, limit=self.history):
+                self._delivered = event["seq"]
+                event = self._with_id(event)
+                for callback in list(self._subscribers):
+                    callback(event)
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.deliver_new()
+            except Exception:
+                telemetry.logger.exception("Reading order events failed")
+
+    def _with_id(self, event):
+        return dict(event, id=f"{self.epoch}-{event['seq']}")
+
+    def parse_id(self, event_id):
+        """The ``seq`` of an id from this event log, or None for any other id."""
+        epoch, _, seq = (event_id or "").partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def events_since(self, last_seq):
+        return [self._with_id(event) for event in self.store.events_after(last_seq, limit=self.history)]
+
+    def close(self):
+        self._stop.set()
+        if self._poller is not None:
+            self._poller.join()
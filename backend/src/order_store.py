@@ -0,0 +1,577 @@
+import json
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+from compliance import normalize_key, order_items
+
+ORDER_FIELDS = ["order_id", "patient_name", "doctor_name", "medicines", "status", "timestamp", "version"]
+# Changing any of these rewrites the order's patient/medicine index rows
+INDEXED_FIELDS = {"patient_name", "doctor_name", "medicines", "timestamp"}
+
+
+class OrderStore:
+    """Storage backend interface used by OrderManager."""
+
+    def insert(self, order):
+        raise NotImplementedError
+
+    def insert_many(self, entries):
+        """Insert ``(order, idempotency_key)`` pairs in one transaction.
+
+        An entry whose key was already used is not inserted; the id of the
+        order first stored under that key is returned in its place. Returns
+        the order ids in entry order.
+        """
+        raise NotImplementedError
+
+    def get(self, order_id):
+        raise NotImplementedError
+
+    def update(self, order_id, changes, expected_version=None):
+        # Apply changes and bump the order version; returns the new order.
+        # With ``expected_version`` nothing is changed (and None returned)
+        # unless the order is still at that version.
+        raise NotImplementedError
+
+    def list_orders(self):
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def query_orders(self, filters, after=None, limit=50):
+        """Return up to ``limit`` orders, newest first.
+
+        ``filters`` may hold date_from, date_to, patient_name, doctor_name,
+        status, patient_key and doctor_key (the normalized names). ``after`` is the
+        (timestamp, order_id) of the last order of the previous page.
+        """
+        raise NotImplementedError
+
+    def query_items(self, filters, after=None, limit=50):
+        """Return up to ``limit`` prescription lines, newest first.
+
+        Lines are the rows built by ``compliance.order_items`` and are kept
+        in step with their orders. ``filters`` may hold patient_key,
+        doctor_key, medicine_keys (a list), date_from and date_to.
+        medicine_keys match prescribed names and active ingredients; without
+        it only the prescribed-name row of each line is returned. ``after``
+        is the (timestamp, order_id, line, medicine_key) of the last row of
+        the previous page.
+        """
+        raise NotImplementedError
+
+    def migrate_json(self, json_path):
+        # Import a legacy patient_records.json file once
+        raise NotImplementedError
+
+    def event_log_id(self):
+        # Identifies this store's event log; event seqs only compare within it
+        raise NotImplementedError
+
+    def append_event(self, event, keep=1000):
+        """Add a status change event and return it with its ``seq``.
+
+        Seqs increase in commit order across every process using the store.
+        Only the last ``keep`` events are kept.
+        """
+        raise NotImplementedError
+
+    def events_after(self, seq, limit=1000):
+        # Up to ``limit`` events with a higher seq, oldest first
+        raise NotImplementedError
+
+    def last_event_seq(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def _matches(order, filters):
+    if filters.get("date_from") and order["timestamp"] < filters["date_from"]:
+        return False
+    if filters.get("date_to") and order["timestamp"] > filters["date_to"]:
+        return False
+    for field in ("patient_name", "doctor_name", "status"):
+        if filters.get(field) and order.get(field) != filters[field]:
+            return False
+    if filters.get("patient_key") and normalize_key(order.get("patient_name")) != filters["patient_key"]:
+        return False
+    if filters.get("doctor_key") and normalize_key(order.get("doctor_name")) != filters["doctor_key"]:
+        return False
+    return True
+
+
+def _item_matches(item, filters):
+    if filters.get("date_from") and item["timestamp"] < filters["date_from"]:
+        return False
+    if filters.get("date_to") and item["timestamp"] > filters["date_to"]:
+        return False
+    for field in ("patient_key", "doctor_key"):
+        if filters.get(field) and item[field] != filters[field]:
+            return False
+    if filters.get("medicine_keys") is None:
+        return not item["ingredient"]
+    return item["medicine_key"] in filters["medicine_keys"]
+
+
+class MemoryOrderStore(OrderStore):
+    """Non-persistent store, useful for tests and simulations."""
+
+    def __init__(self):
+        self.orders = {}
+        self.idempotency_keys = {}
+        self.events = []
+        self._event_log_id = uuid.uuid4().hex[:12]
+        self._last_event_seq = 0
+        self._lock = threading.Lock()
+
+    def insert(self, order):
+        with self._lock:
+            self.orders[order["order_id"]] = dict(order, version=order.get("version", 1))
+
+    def insert_many(self, entries):
+        order_ids = []
+        with self._lock:
+            for order, key in entries:
+                if key is not None and key in self.idempotency_keys:
+                    order_ids.append(self.idempotency_keys[key])
+                    continue
+                self.orders[order["order_id"]] = dict(order, version=order.get("version", 1))
+                if key is not None:
+                    self.idempotency_keys[key] = order["order_id"]
+                order_ids.append(order["order_id"])
+        return order_ids
+
+    def get(self, order_id):
+        order = self.orders.get(order_id)
+        return dict(order) if order else None
+
+    def update(self, order_id, changes, expected_version=None):
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None:
+                return None
+            if expected_version is not None and order["version"] != expected_version:
+                return None
+            order.update(changes)
+            order["version"] += 1
+            return dict(order)
+
+    def list_orders(self):
+        with self._lock:
+            orders = list(self.orders.values())
+        return sorted(orders, key=lambda order: (order["timestamp"], order["order_id"]))
+
+    def count(self):
+        return len(self.orders)
+
+    def query_orders(self, filters, after=None, limit=50):
+        orders = []
+        for order in reversed(self.list_orders()):
+            key = (order["timestamp"], order["order_id"])
+            if after is not None and key >= tuple(after):
+                continue
+            if not _matches(order, filters):
+                continue
+            orders.append(order)
+            if len(orders) == limit:
+                break
+        return orders
+
+    def query_items(self, filters, after=None, limit=50):
+        items = []
+        for order in reversed(self.list_orders()):
+            for item in reversed(order_items(order)):
+                key = (item["timestamp"], item["order_id"], item["line"], item["medicine_key"])
+                if after is not None and key >= tuple(after):
+                    continue
+                if not _item_matches(item, filters):
+                    continue
+                items.append(item)
+                if len(items) == limit:
+                    return items
+        return items
+
+    def migrate_json(self, json_path):
+        json_path = Path(json_path)
+        if not json_path.exists():
+            return 0
+        with open(json_path, "r") as f:
+            records = json.load(f)
+        with self._lock:
+            for record in records:
+                self.orders.setdefault(record["order_id"], record)
+        return len(records)
+
+    def event_log_id(self):
+        return self._event_log_id
+
+    def append_event(self, event, keep=1000):
+        with self._lock:
+            self._last_event_seq += 1
+            event = dict(event, seq=self._last_event_seq)
+            self.events.append(event)
+            del self.events[:-keep]
+        return dict(event)
+
+    def events_after(self, seq, limit=1000):
+        with self._lock:
+            return [dict(event) for event in self.events if event["seq"] > seq][:limit]
+
+    def last_event_seq(self):
+        return self._last_event_seq
+
+
+class SQLiteOrderStore(OrderStore):
+    """SQLite-backed store in WAL mode with indexed lookups.
+
+    Each thread gets its own connection so readers never block on the
+    writer. ``insert_many`` commits a whole batch in one transaction.
+    Prescription lines are indexed in ``order_items`` in the same
+    transaction as their order, so patient, doctor and medicine queries
+    are index range scans. Status change events are kept in
+    ``order_events`` for every process that opens the database.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS orders (
+            order_id TEXT PRIMARY KEY,
+            patient_name TEXT,
+            doctor_name TEXT,
+            medicines TEXT NOT NULL,
+            status TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            version INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE INDEX IF NOT EXISTS idx_orders_patient_name ON orders(patient_name);
+        CREATE INDEX IF NOT EXISTS idx_orders_doctor_name ON orders(doctor_name);
+        CREATE INDEX IF NOT EXISTS idx_orders_timestamp ON orders(timestamp, order_id);
+        CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status, timestamp);
+        CREATE TABLE IF NOT EXISTS order_items (
+            order_id TEXT NOT NULL,
+            line INTEGER NOT NULL,
+            timestamp TEXT NOT NULL,
+            patient_key TEXT,
+            doctor_key TEXT,
+            medicine_key TEXT NOT NULL,
+            ingredient INTEGER NOT NULL DEFAULT 0,
+            patient_name TEXT,
+            doctor_name TEXT,
+            medicine TEXT,
+            dosage TEXT,
+            PRIMARY KEY (order_id, line, medicine_key)
+        );
+        CREATE INDEX IF NOT EXISTS idx_items_patient ON order_items(patient_key, timestamp, order_id, line, medicine_key);
+        CREATE INDEX IF NOT EXISTS idx_items_doctor ON order_items(doctor_key, timestamp, order_id, line, medicine_key);
+        CREATE INDEX IF NOT EXISTS idx_items_medicine ON order_items(medicine_key, timestamp, order_id, line);
+        CREATE INDEX IF NOT EXISTS idx_items_timestamp ON order_items(timestamp, order_id, line, medicine_key);
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            key TEXT PRIMARY KEY,
+            order_id TEXT NOT NULL,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE TABLE IF NOT EXISTS order_events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            previous_status TEXT,
+            version INTEGER NOT NULL,
+            time TEXT NOT NULL
+        );
+    """
+    EVENT_COLUMNS = ("order_id", "status", "previous_status", "version", "time")
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+            self._add_missing_columns(conn)
+            self._rebuild_old_items_table(conn)
+            # Event ids are resumable for as long as this database lives
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('event_log_id', ?)", (uuid.uuid4().hex[:12],))
+        self._index_existing_orders()
+
+    def _add_missing_columns(self, conn):
+        # Databases created by older versions lack the later columns
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(orders)")}
+        if "version" not in columns:
+            conn.execute("ALTER TABLE orders ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        if "patient_key" not in columns:
+            conn.execute("ALTER TABLE orders ADD COLUMN patient_key TEXT")
+        if "doctor_key" not in columns:
+            conn.execute("ALTER TABLE orders ADD COLUMN doctor_key TEXT")
+            # Existing orders get their key when they are indexed again
+            conn.execute("DELETE FROM meta WHERE key = 'indexed_order_items'")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_orders_patient_key ON orders(patient_key, timestamp, order_id)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_orders_doctor_key ON orders(doctor_key, timestamp, order_id)"
+        )
+
+    def _rebuild_old_items_table(self, conn):
+        # order_items from before ingredient rows has a (order_id, line) key;
+        # it is dropped and rebuilt from the orders by _index_existing_orders
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(order_items)")}
+        if "ingredient" in columns:
+            return
+        conn.execute("DROP TABLE order_items")
+        conn.execute("DELETE FROM meta WHERE key = 'indexed_order_items'")
+        conn.executescript(self.SCHEMA)
+
+    def _index_existing_orders(self, batch_size=1000):
+        # Orders written before the patient/medicine indexes existed are
+        # indexed once, a batch per transaction
+        conn = self._connect()
+        if conn.execute("SELECT value FROM meta WHERE key = 'indexed_order_items'").fetchone():
+            return
+        last_id = ""
+        while True:
+            rows = conn.execute(
+                "SELECT * FROM orders WHERE order_id > ? ORDER BY order_id LIMIT ?", (last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            with conn:
+                for row in rows:
+                    self._reindex(conn, self._from_row(row))
+            last_id = rows[-1]["order_id"]
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('indexed_order_items', '1')")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @staticmethod
+    def _to_row(order):
+        return (
+            order["order_id"],
+            order.get("patient_name"),
+            order.get("doctor_name"),
+            json.dumps(order.get("medicines") or []),
+            order.get("status", "Pending"),
+            order["timestamp"],
+            normalize_key(order.get("patient_name")),
+            normalize_key(order.get("doctor_name")),
+        )
+
+    @staticmethod
+    def _from_row(row):
+        order = dict(row)
+        order["medicines"] = json.loads(order["medicines"])
+        order.pop("patient_key", None)
+        order.pop("doctor_key", None)
+        return order
+
+    INSERT_ORDER = (
+        "INSERT {conflict} INTO orders "
+        "(order_id, patient_name, doctor_name, medicines, status, timestamp, patient_key, doctor_key) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+    ITEM_COLUMNS = (
+        "order_id", "line", "timestamp", "patient_key", "doctor_key", "medicine_key", "ingredient",
+        "patient_name", "doctor_name", "medicine", "dosage",
+    )
+
+    def _write_order(self, conn, order, conflict=""):
+        cursor = conn.execute(self.INSERT_ORDER.format(conflict=conflict), self._to_row(order))
+        if cursor.rowcount:
+            self._insert_items(conn, order)
+
+    def _reindex(self, conn, order):
+        conn.execute(
+            "UPDATE orders SET patient_key = ?, doctor_key = ? WHERE order_id = ?",
+            (normalize_key(order.get("patient_name")), normalize_key(order.get("doctor_name")), order["order_id"]),
+        )
+        conn.execute("DELETE FROM order_items WHERE order_id = ?", (order["order_id"],))
+        self._insert_items(conn, order)
+
+    def _insert_items(self, conn, order):
+        conn.executemany(
+            f"INSERT INTO order_items ({', '.join(self.ITEM_COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in self.ITEM_COLUMNS)})",
+            [tuple(item[column] for column in self.ITEM_COLUMNS) for item in order_items(order)],
+        )
+
+    def insert(self, order):
+        with self._connect() as conn:
+            self._write_order(conn, order)
+
+    def insert_many(self, entries):
+        order_ids = []
+        conn = self._connect()
+        with conn:
+            # Take the write lock up front so the key checks and the inserts
+            # see the same state
+            conn.execute("BEGIN IMMEDIATE")
+            for order, key in entries:
+                if key is not None:
+                    row = conn.execute(
+                        "SELECT order_id FROM idempotency_keys WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        order_ids.append(row["order_id"])
+                        continue
+                self._write_order(conn, order)
+                if key is not None:
+                    conn.execute(
+                        "INSERT INTO idempotency_keys (key, order_id) VALUES (?, ?)", (key, order["order_id"])
+                    )
+                order_ids.append(order["order_id"])
+        return order_ids
+
+    def get(self, order_id):
+        row = self._connect().execute(
+            "SELECT * FROM orders WHERE order_id = ?", (order_id,)
+        ).fetchone()
+        return self._from_row(row) if row else None
+
+    def update(self, order_id, changes, expected_version=None):
+        columns = [field for field in changes if field in ORDER_FIELDS and field not in ("order_id", "version")]
+        values = [
+            json.dumps(changes[field]) if field == "medicines" else changes[field]
+            for field in columns
+        ]
+        assignments = "".join(f"{field} = ?, " for field in columns)
+        condition, params = "order_id = ?", [order_id]
+        if expected_version is not None:
+            condition += " AND version = ?"
+            params.append(expected_version)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE orders SET {assignments}version = version + 1 WHERE {condition}",
+                values + params,
+            )
+            if cursor.rowcount and INDEXED_FIELDS.intersection(columns):
+                row = conn.execute("SELECT * FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+                self._reindex(conn, self._from_row(row))
+        if cursor.rowcount == 0:
+            return None
+        return self.get(order_id)
+
+    def list_orders(self):
+        rows = self._connect().execute("SELECT * FROM orders ORDER BY timestamp, order_id")
+        return [self._from_row(row) for row in rows]
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    def query_orders(self, filters, after=None, limit=50):
+        clauses, params = [], []
+        if filters.get("date_from"):
+            clauses.append("timestamp >= ?")
+            params.append(filters["date_from"])
+        if filters.get("date_to"):
+            clauses.append("timestamp <= ?")
+            params.append(filters["date_to"])
+        for field in ("patient_name", "doctor_name", "status", "patient_key", "doctor_key"):
+            if filters.get(field):
+                clauses.append(f"{field} = ?")
+                params.append(filters[field])
+        if after is not None:
+            # Keyset pagination keeps every page an index range scan
+            clauses.append("(timestamp, order_id) < (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(
+            f"SELECT * FROM orders {where} ORDER BY timestamp DESC, order_id DESC LIMIT ?",
+            params + [limit],
+        )
+        return [self._from_row(row) for row in rows]
+
+    def query_items(self, filters, after=None, limit=50):
+        clauses, params = [], []
+        if filters.get("date_from"):
+            clauses.append("timestamp >= ?")
+            params.append(filters["date_from"])
+        if filters.get("date_to"):
+            clauses.append("timestamp <= ?")
+            params.append(filters["date_to"])
+        for field in ("patient_key", "doctor_key"):
+            if filters.get(field):
+                clauses.append(f"{field} = ?")
+                params.append(filters[field])
+        medicine_keys = filters.get("medicine_keys")
+        if medicine_keys is not None:
+            if not medicine_keys:
+                return []
+            clauses.append(f"medicine_key IN ({', '.join('?' for _ in medicine_keys)})")
+            params.extend(medicine_keys)
+        else:
+            clauses.append("ingredient = 0")
+        if after is not None:
+            clauses.append("(timestamp, order_id, line, medicine_key) < (?, ?, ?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(
+            f"SELECT {', '.join(self.ITEM_COLUMNS)} FROM order_items {where} "
+            "ORDER BY timestamp DESC, order_id DESC, line DESC, medicine_key DESC LIMIT ?",
+            params + [limit],
+        )
+        return [dict(row) for row in rows]
+
+    def migrate_json(self, json_path):
+        json_path = Path(json_path)
+        conn = self._connect()
+        done = conn.execute("SELECT value FROM meta WHERE key = 'migrated_json'").fetchone()
+        if done or not json_path.exists():
+            return 0
+        with open(json_path, "r") as f:
+            records = json.load(f)
+        with conn:
+            for record in records:
+                self._write_order(conn, record, conflict="OR IGNORE")
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('migrated_json', ?)", (str(json_path),)
+            )
+        return len(records)
+
+    def event_log_id(self):
+        return self._connect().execute("SELECT value FROM meta WHERE key = 'event_log_id'").fetchone()[0]
+
+    def append_event(self, event, keep=1000):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"INSERT INTO order_events ({', '.join(self.EVENT_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in self.EVENT_COLUMNS)})",
+                tuple(event[column] for column in self.EVENT_COLUMNS),
+            )
+            seq = cursor.lastrowid
+            conn.execute("DELETE FROM order_events WHERE seq <= ?", (seq - keep,))
+        return dict(event, seq=seq)
+
+    def events_after(self, seq, limit=1000):
+        rows = self._connect().execute(
+            "SELECT * FROM order_events WHERE seq > ? ORDER BY seq LIMIT ?", (seq, limit)
+        )
+        return [dict(row) for row in rows]
+
+    def last_event_seq(self):
+        return self._connect().execute("SELECT COALESCE(MAX(seq), 0) FROM order_events").fetchone()[0]
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
@@ -0,0 +1,92 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import telemetry
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class OrderWriter:
+    """Single writer thread that group-commits new orders.
+
+    Orders queued by any thread are committed by one thread in batches of up
+    to ``max_batch``. A batch is committed as soon as it is full or
+    ``max_delay`` seconds after its first order arrived, so no order waits
+    longer than that for its transaction to start. If a batch fails, its
+    orders are retried one by one so one bad order does not fail the others.
+    """
+
+    def __init__(self, store, max_batch=64, max_delay=0.005):
+        self.store = store
+        self.max_batch = max(max_batch, 1)
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="order-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, order, idempotency_key=None):
+        """Queue ``order``; the future resolves to the stored order id."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Order writer is closed")
+            self._queue.put((order, idempotency_key, future))
+        return future
+
+    def close(self):
+        # Orders already queued are still committed
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Commit what we have, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._commit(batch)
+
+    def _commit(self, batch):
+        try:
+            with telemetry.stage_timer("order_batch_commit"):
+                order_ids = self.store.insert_many([(order, key) for order, key, _future in batch])
+        except Exception as e:
+            if len(batch) > 1:
+                for item in batch:
+                    self._commit([item])
+                return
+            telemetry.logger.exception("Order insert failed")
+            batch[0][2].set_exception(e)
+            return
+        if telemetry.METRICS_ENABLED:
+            telemetry.registry.observe(
+                "pharmassist_order_batch_size", len(batch), help_text="Orders per group commit",
+                buckets=BATCH_SIZE_BUCKETS,
+            )
+        for (_order, _key, future), order_id in zip(batch, order_ids):
+            future.set_result(order_id)
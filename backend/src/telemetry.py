@@ -0,0 +1,203 @@
+"""Lightweight timing, metrics and structured logging for the backend.
+
+Stages are timed with ``stage_timer("ocr")`` (or the ``timed`` decorator)
+and exported in Prometheus text format by ``render_metrics``. Set
+``METRICS_ENABLED=0`` to turn every timer into a no-op.
+"""
+import bisect
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+DURATION_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+logger = logging.getLogger("pharmassist")
+
+
+class Histogram:
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    """Metric families keyed by name, each holding one series per label set."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.kinds = {}
+        self.help = {}
+        self.series = {}
+
+    def _declare(self, name, kind, help_text):
+        if name not in self.kinds:
+            self.kinds[name] = kind
+            self.help[name] = help_text
+            self.series[name] = {}
+
+    def observe(self, name, value, labels=(), help_text="", buckets=DURATION_BUCKETS):
+        with self._lock:
+            self._declare(name, "histogram", help_text)
+            histogram = self.series[name].get(labels)
+            if histogram is None:
+                histogram = self.series[name][labels] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, labels=(), help_text="", kind="counter"):
+        with self._lock:
+            self._declare(name, kind, help_text)
+            self.series[name][labels] = self.series[name].get(labels, 0) + amount
+
+    def set(self, name, value, labels=(), help_text=""):
+        with self._lock:
+            self._declare(name, "gauge", help_text)
+            self.series[name][labels] = value
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, kind in sorted(self.kinds.items()):
+                lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(self.series[name].items()):
+                    if kind == "histogram":
+                        lines.extend(_render_histogram(name, labels, value))
+                    else:
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _key, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+def _render_histogram(name, labels, histogram):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+    lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.total}")
+    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+    return lines
+
+
+registry = Registry()
+_capture = threading.local()
+
+
+def record_stage(stage, seconds, error=False):
+    observations = getattr(_capture, "observations", None)
+    if observations is not None:
+        # Inside a pool worker: hand the numbers back to the parent process
+        observations.append((stage, seconds, error))
+        return
+    labels = (("stage", stage),)
+    registry.observe("pharmassist_stage_duration_seconds", seconds, labels, "Time spent per pipeline stage")
+    if error:
+        registry.inc("pharmassist_stage_errors_total", 1, labels, "Pipeline stage failures")
+
+
+@contextmanager
+def _stage_timer(stage):
+    labels = (("stage", stage),)
+    registry.inc("pharmassist_stage_in_flight", 1, labels, "Pipeline stages currently running", kind="gauge")
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        registry.inc("pharmassist_stage_in_flight", -1, labels, kind="gauge")
+        record_stage(stage, seconds, error)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("stage finished", extra={"stage": stage, "duration_ms": round(seconds * 1000, 3), "error": error})
+
+
+def stage_timer(stage):
+    if not METRICS_ENABLED:
+        return nullcontext()
+    return _stage_timer(stage)
+
+
+def timed(stage):
+    def decorator(func):
+        if not METRICS_ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def capture():
+    """Collect stage observations in a list instead of the local registry."""
+    previous = getattr(_capture, "observations", None)
+    _capture.observations = []
+    try:
+        yield _capture.observations
+    finally:
+        _capture.observations = previous
+
+
+def replay(observations):
+    for stage, seconds, error in observations:
+        record_stage(stage, seconds, error)
+
+
+def render_metrics():
+    return registry.render()
+
+
+class JsonFormatter(logging.Formatter):
+    EXTRA_FIELDS = ("stage", "duration_ms", "error", "method", "path", "status_code")
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": request_id_var.get(),
+        }
+        for field in self.EXTRA_FIELDS:
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+def configure_logging():
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
+    logger.propagate = False
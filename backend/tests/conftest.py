@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from order_manager import OrderManager  # noqa: E402
+from order_store import MemoryOrderStore, SQLiteOrderStore  # noqa: E402
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        store = MemoryOrderStore()
+    else:
+        store = SQLiteOrderStore(tmp_path / "orders.sqlite3")
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def manager(store, tmp_path, monkeypatch):
+    # The legacy patient_records.json and invoices are looked up relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    manager = OrderManager(store=store)
+    yield manager
+    manager.writer.close()
+
+
+def make_order(order_id, timestamp="2025-01-10 09:00:00", patient="Jerry Lucas", medicines=None):
+    return {
+        "order_id": order_id,
+        "patient_name": patient,
+        "doctor_name": "Dr Maria Lopez",
+        "medicines": medicines if medicines is not None else [
+            {"name": "Paracetamol", "dosage": "500mg", "composition": "Paracetamol (500mg)"},
+        ],
+        "status": "Pending",
+        "timestamp": timestamp,
+    }
@@ -0,0 +1,53 @@
+import zipfile
+
+import batch_ingest
+import ingest
+
+PNG = b"\x89PNG\r\n\x1a\n"
+
+
+def fake_extract(document, file_format):
+    return {"medicines": []}
+
+
+def write_documents(directory, names):
+    for name in names:
+        (directory / name).write_bytes(PNG + name.encode())
+
+
+def test_checkpoint_is_written_after_the_result_is_handled(tmp_path):
+    write_documents(tmp_path, ["a.png", "b.png"])
+    checkpoint = batch_ingest.Checkpoint(tmp_path / "batch.ckpt")
+
+    results = batch_ingest.run_batch(tmp_path, workers=1, checkpoint=checkpoint, extract=fake_extract)
+    assert next(results)["source"] == "a.png"
+    assert "a.png" not in checkpoint
+    # The consumer stops (crash, client disconnect) before handling the result
+    results.close()
+
+    resumed = batch_ingest.Checkpoint(tmp_path / "batch.ckpt")
+    sources = [result.get("source") for result in batch_ingest.run_batch(tmp_path, workers=1, checkpoint=resumed, extract=fake_extract)]
+    assert sources == ["a.png", "b.png", None]
+    assert resumed.completed == {"a.png", "b.png"}
+
+
+def test_oversized_archive_entries_are_not_read(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "MAX_UPLOAD_BYTES", 1024)
+    archive_path = tmp_path / "scans.zip"
+    with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("big.png", PNG + b"\0" * (10 * 1024 * 1024))
+        archive.writestr("small.png", PNG)
+    read = []
+    original_read = zipfile.ZipFile.read
+
+    def recording_read(archive, member, pwd=None):
+        read.append(getattr(member, "filename", member))
+        return original_read(archive, member, pwd)
+
+    monkeypatch.setattr(zipfile.ZipFile, "read", recording_read)
+
+    results = list(batch_ingest.run_batch(archive_path, workers=1, extract=fake_extract))
+
+    assert read == ["small.png"]
+    assert [(result.get("source"), result.get("status")) for result in results[:-1]] == [("big.png", "error"), ("small.png", "ok")]
+    assert results[-1]["summary"]["failed"] == 1
@@ -0,0 +1,38 @@
+import pytest
+
+from invoice_renderer import UNIT_PRICE, invoice_lines, parse_quantity
+from order_manager import InvalidOrderError, normalize_medicines
+
+
+@pytest.mark.parametrize("value, expected", [(None, None), (3, 3), ("3", 3), (2.0, 2)])
+def test_parse_quantity_accepts_whole_numbers(value, expected):
+    assert parse_quantity(value) == expected
+
+
+@pytest.mark.parametrize("value", ["abc", 0, -1, 2.5, True, [1]])
+def test_parse_quantity_rejects_other_values(value):
+    with pytest.raises(ValueError):
+        parse_quantity(value)
+
+
+def test_normalize_medicines_converts_quantities():
+    assert normalize_medicines([{"name": "Paracetamol", "quantity": "3"}]) == [{"name": "Paracetamol", "quantity": 3}]
+
+
+@pytest.mark.parametrize("medicines", [
+    "Paracetamol",
+    ["Tramadol", 5],
+    [{"name": "Paracetamol", "quantity": "abc"}],
+])
+def test_normalize_medicines_rejects_invalid_orders(medicines):
+    with pytest.raises(InvalidOrderError):
+        normalize_medicines(medicines)
+
+
+def test_invoice_lines_tolerate_legacy_rows():
+    order = {"medicines": ["Tramadol", 5, None, {"name": "Paracetamol", "quantity": "abc"}, {"name": "Ibuprofen", "quantity": 4}]}
+
+    lines, total = invoice_lines(order)
+
+    assert [(line["name"], line["quantity"]) for line in lines] == [("Tramadol", 1), ("Paracetamol", 1), ("Ibuprofen", 4)]
+    assert total == UNIT_PRICE * 6
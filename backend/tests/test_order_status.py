@@ -0,0 +1,163 @@
+import time
+
+import pytest
+
+import dispenser_sim
+from conftest import make_order
+from order_manager import OrderManager
+from order_status import STATUSES, InvalidTransitionError, OrderEventBus
+from order_store import MemoryOrderStore, SQLiteOrderStore
+
+
+def test_status_moves_through_the_lifecycle(manager, store):
+    store.insert(make_order("a"))
+
+    for version, status in enumerate(STATUSES[1:], start=2):
+        order = manager.update_status("a", status)
+        assert (order["status"], order["version"]) == (status, version)
+
+
+def test_invalid_transition_is_rejected(manager, store):
+    store.insert(make_order("a"))
+
+    with pytest.raises(InvalidTransitionError):
+        manager.update_status("a", "Ready")
+    assert manager.track_order("a")["status"] == "Pending"
+
+
+def test_stale_expected_version_is_rejected(manager, store):
+    store.insert(make_order("a"))
+    manager.update_status("a", "Verified", expected_version=1)
+
+    with pytest.raises(InvalidTransitionError):
+        manager.update_status("a", "Dispensing", expected_version=1)
+    assert manager.track_order("a")["version"] == 2
+
+
+def test_unknown_order_is_none(manager):
+    assert manager.update_status("missing", "Verified") is None
+
+
+def test_updates_are_published_in_order(manager, store):
+    store.insert(make_order("a"))
+    received = []
+    manager.events.subscribe(received.append)
+
+    manager.update_status("a", "Verified")
+    manager.update_status("a", "Dispensing")
+
+    assert [(event["status"], event["previous_status"]) for event in received] == [
+        ("Verified", "Pending"), ("Dispensing", "Verified"),
+    ]
+    assert [event["seq"] for event in received] == [1, 2]
+
+
+def publish(bus, order_id):
+    return bus.publish({"order_id": order_id, "status": "Verified", "version": 2}, "Pending")
+
+
+def test_resume_replays_events_after_last_event_id(store):
+    bus = OrderEventBus(store)
+    events = [publish(bus, f"order-{index}") for index in range(3)]
+
+    last_seq = bus.parse_id(events[0]["id"])
+
+    assert [event["id"] for event in bus.events_since(last_seq)] == [events[1]["id"], events[2]["id"]]
+
+
+@pytest.mark.parametrize("event_id", [None, "", "garbage", "1", "0123456789ab-x"])
+def test_malformed_event_id_is_not_resumed(event_id):
+    assert OrderEventBus(MemoryOrderStore()).parse_id(event_id) is None
+
+
+def test_event_ids_resume_across_restarts(tmp_path):
+    store = SQLiteOrderStore(tmp_path / "orders.sqlite3")
+    before_restart = publish(OrderEventBus(store), "a")["id"]
+    store.close()
+
+    store = SQLiteOrderStore(tmp_path / "orders.sqlite3")
+    bus = OrderEventBus(store)
+    after_restart = publish(bus, "b")
+
+    assert bus.events_since(bus.parse_id(before_restart)) == [after_restart]
+    store.close()
+
+
+def test_event_id_from_another_database_is_not_resumed():
+    other_id = publish(OrderEventBus(MemoryOrderStore()), "a")["id"]
+
+    assert OrderEventBus(MemoryOrderStore()).parse_id(other_id) is None
+
+
+def test_events_reach_subscribers_of_other_workers(tmp_path, monkeypatch):
+    # Two workers, each with its own OrderManager on the same database
+    monkeypatch.chdir(tmp_path)
+    workers = [OrderManager(store=SQLiteOrderStore(tmp_path / "orders.sqlite3")) for _ in range(2)]
+    try:
+        watcher, updater = workers
+        watcher.events.poll_interval = 0.01
+        received = []
+        watcher.events.subscribe(received.append)
+
+        updater.store.insert(make_order("a"))
+        updater.update_status("a", "Verified")
+        deadline = time.monotonic() + 5
+        while not received and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert [(event["order_id"], event["status"]) for event in received] == [("a", "Verified")]
+    finally:
+        for manager in workers:
+            manager.close()
+
+
+def test_dispenser_moves_verified_orders_to_ready(manager, store):
+    store.insert(make_order("a"))
+    store.insert(make_order("b"))
+    dispenser, unsubscribe = dispenser_sim.attach(manager, dispense_seconds=0)
+    try:
+        manager.update_status("a", "Verified")
+        manager.update_status("b", "Verified")
+        assert dispenser.wait_idle(timeout=5)
+    finally:
+        unsubscribe()
+        dispenser.stop()
+
+    assert sorted(dispenser.dispensed) == ["a", "b"]
+    assert manager.track_order("a")["status"] == "Ready"
+    assert manager.track_order("b")["status"] == "Ready"
+
+
+def test_dispenser_keeps_running_after_a_failed_order():
+    done = []
+
+    def update_status(order_id, status):
+        if order_id == "broken":
+            raise RuntimeError("store unavailable")
+        done.append((order_id, status))
+
+    dispenser = dispenser_sim.SimulatedDispenser(update_status, dispense_seconds=0).start()
+    try:
+        dispenser.handle({"order_id": "broken", "status": "Verified"})
+        dispenser.handle({"order_id": "a", "status": "Verified"})
+        assert dispenser.wait_idle(timeout=5)
+    finally:
+        dispenser.stop()
+
+    assert dispenser.failed == ["broken"]
+    assert done == [("a", "Dispensing"), ("a", "Ready")]
+
+
+def test_dispenser_logs_failed_orders(caplog):
+    def update_status(order_id, status):
+        raise RuntimeError("store unavailable")
+
+    dispenser = dispenser_sim.SimulatedDispenser(update_status, dispense_seconds=0).start()
+    try:
+        with caplog.at_level("ERROR"):
+            dispenser.handle({"order_id": "broken", "status": "Verified"})
+            assert dispenser.wait_idle(timeout=5)
+    finally:
+        dispenser.stop()
+
+    assert any("broken" in record.getMessage() and record.exc_info for record in caplog.records)
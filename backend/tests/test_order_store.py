@@ -0,0 +1,128 @@
+import sqlite3
+
+import pytest
+
+from conftest import make_order
+from order_store import SQLiteOrderStore
+
+
+def all_pages(fetch, key):
+    items, cursor = [], None
+    while True:
+        page = fetch(cursor)
+        items.extend(page[key])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def test_history_pages_orders_sharing_a_timestamp(manager, store):
+    # Orders written in the same second differ only by order_id
+    for index in range(7):
+        store.insert(make_order(f"order-{index}"))
+    store.insert(make_order("order-late", timestamp="2025-01-11 08:00:00"))
+
+    orders = all_pages(lambda cursor: manager.get_order_history(cursor=cursor, limit=3), "orders")
+
+    assert [order["order_id"] for order in orders] == ["order-late"] + [f"order-{index}" for index in reversed(range(7))]
+
+
+def test_history_filters_by_patient(manager, store):
+    store.insert(make_order("a", patient="Jerry Lucas"))
+    store.insert(make_order("b", patient="Anna Petrova"))
+
+    orders = manager.get_patient_history(" jerry  LUCAS ", days=100000)["orders"]
+
+    assert [order["order_id"] for order in orders] == ["a"]
+
+
+def test_history_name_filters_ignore_case_and_spacing(manager, store):
+    store.insert(make_order("a", patient="Jerry Lucas"))
+    store.insert(make_order("b", patient="Anna Petrova"))
+
+    by_patient = manager.get_order_history({"patient_name": "jerry lucas"})["orders"]
+    by_doctor = manager.get_order_history({"doctor_name": " dr  maria LOPEZ"})["orders"]
+
+    assert [order["order_id"] for order in by_patient] == ["a"]
+    assert [order["order_id"] for order in by_doctor] == ["b", "a"]
+    assert "doctor_key" not in by_doctor[0]
+
+
+def test_history_date_to_covers_the_whole_day(manager, store):
+    store.insert(make_order("a", timestamp="2025-01-10 23:30:00"))
+    store.insert(make_order("b", timestamp="2025-01-11 00:00:00"))
+
+    orders = manager.get_order_history({"date_from": "2025-01-10", "date_to": "2025-01-10"})["orders"]
+
+    assert [order["order_id"] for order in orders] == ["a"]
+
+
+@pytest.mark.parametrize("value", ["10/01/2025", "2025-1-10x", "yesterday", "2025-02-30"])
+def test_history_rejects_dates_that_are_not_iso(manager, value):
+    with pytest.raises(ValueError):
+        manager.get_order_history({"date_from": value})
+    with pytest.raises(ValueError):
+        manager.export_invoices({"date_to": value})
+
+
+def test_doctor_key_is_backfilled_for_existing_orders(tmp_path):
+    # A database written before doctor_key existed
+    path = tmp_path / "orders.sqlite3"
+    store = SQLiteOrderStore(path)
+    store.insert(make_order("a"))
+    store.close()
+    with sqlite3.connect(path) as conn:
+        conn.execute("DROP INDEX idx_orders_doctor_key")
+        conn.execute("ALTER TABLE orders DROP COLUMN doctor_key")
+
+    store = SQLiteOrderStore(path)
+    try:
+        orders = store.query_orders({"doctor_key": "dr maria lopez"})
+    finally:
+        store.close()
+
+    assert [order["order_id"] for order in orders] == ["a"]
+
+
+def test_invalid_cursor_is_rejected(manager):
+    with pytest.raises(ValueError):
+        manager.get_order_history(cursor="not-a-cursor")
+
+
+def test_update_is_compare_and_set_on_version(store):
+    store.insert(make_order("a"))
+
+    updated = store.update("a", {"status": "Verified"}, expected_version=1)
+    stale = store.update("a", {"status": "Dispensing"}, expected_version=1)
+
+    assert updated["version"] == 2
+    assert stale is None
+    assert store.get("a")["status"] == "Verified"
+    assert store.get("a")["version"] == 2
+
+
+def test_register_lists_brand_names_by_ingredient(manager, store):
+    store.insert(make_order("a", medicines=[
+        {"name": "Ultracet", "dosage": "37.5mg", "composition": "Tramadol (37.5mg) + Paracetamol (325mg)"},
+        {"name": "Paracetamol", "dosage": "500mg", "composition": "Paracetamol (500mg)"},
+    ]))
+
+    entries = manager.get_compliance_register()["entries"]
+
+    assert [(entry["medicine"], entry["substance"]) for entry in entries] == [("Ultracet", "tramadol")]
+
+
+def test_register_pages_every_line_once(manager, store):
+    medicines = [
+        {"name": "Ultracet", "dosage": "37.5mg", "composition": "Tramadol (37.5mg) + Paracetamol (325mg)"},
+        {"name": "Tramadol", "dosage": "50mg", "composition": "Tramadol (50mg)"},
+    ]
+    for index in range(5):
+        store.insert(make_order(f"order-{index}", medicines=medicines))
+
+    entries = all_pages(
+        lambda cursor: manager.get_compliance_register({"medicine": "tramadol"}, cursor=cursor, limit=2), "entries"
+    )
+
+    lines = [(entry["order_id"], entry["line"]) for entry in entries]
+    assert len(lines) == len(set(lines)) == 10
@@ -1,20 +1,44 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pdf2image import convert_from_bytes
-from pathlib import Path
 import os
-import pandas as pd
+import uuid
 
 # Path to Poppler for PDF conversion
 POPPLER_PATH = r"C:/poppler-24.08.0/Library/bin"
 BASE_URL = "http://127.0.0.1:8000"
+# (connect, read) timeouts in seconds; OCR of a long scan can take a while
+REQUEST_TIMEOUT = (3.05, 30)
+EXTRACT_TIMEOUT = (3.05, 300)
 
-# Load medicine database
-@st.cache_data
-def load_medicine_data():
-    return pd.read_csv(r"backend\Medicine_Details.csv")
+# One pooled session per Streamlit server, reused by every rerun
+@st.cache_resource
+def get_session():
+    session = requests.Session()
+    # Idempotent requests are retried on connection errors and 502/503/504;
+    # POSTs only go out once (orders carry an Idempotency-Key instead)
+    retries = Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
-medicine_df = load_medicine_data()
+@st.cache_data(ttl=5, show_spinner=False)
+def fetch_order(order_id):
+    response = get_session().get(f"{BASE_URL}/track_order/{order_id}", timeout=REQUEST_TIMEOUT)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+# Invoices only change with the order version, so they are cached per version
+@st.cache_data(max_entries=64, show_spinner=False)
+def fetch_invoice(order_id, version):
+    response = get_session().get(f"{BASE_URL}/download_invoice/{order_id}", timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.content
 
 # Title and Navigation
 st.sidebar.title("PharmAssist Pro")
@@ -42,29 +66,39 @@ def upload_prescription():
             with st.spinner("Extracting prescription details..."):
                 try:
                     # Send request to backend
-                    response = requests.post(
+                    response = get_session().post(
                         f"{BASE_URL}/extract_from_doc",
                         files={"file": file.getvalue()},
-                        data={"file_format": "prescription"}
+                        data={"file_format": "prescription"},
+                        timeout=EXTRACT_TIMEOUT
                     )
                     response.raise_for_status()
                     data = response.json()
+                    if "error" in data:
+                        raise Exception(data["error"])
+
+                    # The backend has already checked the medicines against the catalog
+                    invalid_meds = data.get("invalid_meds", [])
 
-                    # Validate medicines against CSV
-                    invalid_meds = []
-                    for med in data.get("medicines", []):
-                        if not medicine_df['Medicine Name'].str.contains(med['name'], case=False).any():
-                            invalid_meds.append(med['name'])
-                    
                     # Store extracted data in session state
                     st.session_state["prescription_data"] = data
                     st.session_state["invalid_meds"] = invalid_meds
+                    # One order per extraction, however often Generate Order is clicked
+                    st.session_state["order_idempotency_key"] = str(uuid.uuid4())
                     
                     st.success("Prescription details extracted successfully!")
                     
                     # Show validation warnings
                     if invalid_meds:
-                        st.warning(f"Unrecognized medications detected: {', '.join(invalid_meds)}. Please verify with pharmacist.")
+                        names = ', '.join(med['name'] for med in invalid_meds)
+                        st.warning(f"Unrecognized medications detected: {names}. Please verify with pharmacist.")
+                        for med in invalid_meds:
+                            if med.get("suggestions"):
+                                st.caption(f"Did you mean for {med['name']}: {', '.join(med['suggestions'])}?")
+                    # Names the backend corrected from a fuzzy match must be confirmed
+                    for med in data.get("corrected_meds", []):
+                        st.warning(f"Read '{med['ocr_name']}' as {med['name']} "
+                                   f"(match {med['score']:.0%}). Please confirm with pharmacist.")
 
                 except Exception as e:
                     st.error(f"Error: {str(e)}")
@@ -81,25 +115,26 @@ def upload_prescription():
 
             st.subheader("Prescribed Medicines")
             for med in data.get("medicines", []):
-                # Get medicine details from CSV
-                med_details = medicine_df[medicine_df['Medicine Name'].str.contains(med['name'], case=False)]
-                
                 st.write(f"**Medicine:** {med.get('name', 'N/A')}")
                 st.write(f"**Dosage:** {med.get('dosage', 'N/A')}")
                 st.write(f"**Frequency:** {med.get('frequency', 'N/A')}")
                 st.write(f"**Duration:** {med.get('duration', 'N/A')}")
                 
-                # Display additional info from CSV
-                if not med_details.empty:
-                    st.write(f"**Composition:** {med_details.iloc[0]['Composition']}")
-                    st.write(f"**Manufacturer:** {med_details.iloc[0]['Manufacturer']}")
-                    st.write(f"**Common Side Effects:** {med_details.iloc[0]['Side_effects']}")
+                # Catalog details come enriched from the backend
+                if med.get("composition", "N/A") != "N/A":
+                    st.write(f"**Composition:** {med['composition']}")
+                    st.write(f"**Manufacturer:** {med.get('manufacturer', 'N/A')}")
+                    st.write(f"**Common Side Effects:** {med.get('side_effects', 'N/A')}")
                 
                 # Display stock and pricing
+                unit_price = med.get("unit_price", 12.99)
                 st.write(f"**Available Stock:** 100")
-                st.write(f"**Price per Unit:** $12.99")
-                quantity = st.number_input(f"Quantity for {med.get('name')}", min_value=1, max_value=100, value=1)
-                total_price = quantity * 12.99
+                st.write(f"**Price per Unit:** ${unit_price:.2f}")
+                # Defaults to the course length read from the sig; sent with the order
+                quantity = st.number_input(f"Quantity for {med.get('name')}", min_value=1, max_value=1000,
+                                           value=min(int(med.get("quantity") or 1), 1000))
+                med["quantity"] = quantity
+                total_price = quantity * unit_price
                 st.write(f"**Total Price:** ${total_price:.2f}")
                 st.write("---")
 
@@ -111,7 +146,12 @@ def upload_prescription():
                     "medicines": data.get("medicines")
                 }
                 try:
-                    order_response = requests.post(f"{BASE_URL}/generate_order", json=order_data)
+                    order_response = get_session().post(
+                        f"{BASE_URL}/generate_order",
+                        json=order_data,
+                        headers={"Idempotency-Key": st.session_state["order_idempotency_key"]},
+                        timeout=REQUEST_TIMEOUT
+                    )
                     if order_response.status_code == 200:
                         st.success("Order generated successfully!")
                         st.session_state["order_id"] = order_response.json().get("order_id")
@@ -122,40 +162,92 @@ def upload_prescription():
                 except Exception as e:
                     st.error(f"Error: {str(e)}")
 
+# The order lifecycle is defined by the backend (order_status.STATUSES)
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_order_statuses():
+    response = get_session().get(f"{BASE_URL}/order_statuses", timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json()["statuses"]
+
 # Order History Page
+HISTORY_PAGE_SIZE = 50
+
+@st.cache_data(ttl=10, show_spinner=False)
+def fetch_order_history(filters, cursor=None):
+    params = {k: v for k, v in filters.items() if v}
+    params.update({"limit": HISTORY_PAGE_SIZE, "include_invoice": "true"})
+    if cursor:
+        params["cursor"] = cursor
+    response = get_session().get(f"{BASE_URL}/order_history", params=params, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
 def view_order_history():
     st.header("Order History")
+
+    with st.expander("Filters"):
+        col1, col2 = st.columns(2)
+        patient_name = col1.text_input("Patient Name")
+        doctor_name = col2.text_input("Doctor Name")
+        date_from = col1.date_input("From", value=None)
+        date_to = col2.date_input("To", value=None)
+        status = st.selectbox("Status", [""] + fetch_order_statuses())
+    filters = {
+        "patient_name": patient_name,
+        "doctor_name": doctor_name,
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None,
+        "status": status
+    }
+
     if st.button("Refresh History"):
         try:
-            response = requests.get(f"{BASE_URL}/order_history")
-            if response.status_code == 200:
-                orders = response.json()
-                for order in orders:
-                    order_id = order.get('order_id')
-                    st.write(f"**Order ID:** {order_id}")
-                    st.write(f"**Patient Name:** {order.get('patient_name')}")
-                    st.write(f"**Doctor Name:** {order.get('doctor_name')}")
-                    st.write(f"**Status:** {order.get('status')}")
-                    st.write("**Prescribed Medicines:**")
-                    for med in order.get("medicines", []):
-                        st.write(f"- {med.get('name')} ({med.get('dosage')})")
-                    st.write("---")
-
-                    # Download invoice using Streamlit's native button
-                    invoice_response = requests.get(f"{BASE_URL}/download_invoice/{order_id}")
-                    if invoice_response.status_code == 200:
-                        st.download_button(
-                            label=f"Download Invoice for Order {order_id}",
-                            data=invoice_response.content,
-                            file_name=f"invoice_{order_id}.txt",
-                            mime="text/plain"
-                        )
-                    else:
-                        st.error("Failed to fetch invoice")
-            else:
-                st.error("Failed to fetch order history")
+            # Refresh means fresh data, not whatever is still cached
+            fetch_order_history.clear()
+            st.session_state["history_invoices"] = {}
+            page = fetch_order_history(filters)
+            st.session_state["history_orders"] = page["orders"]
+            st.session_state["history_cursor"] = page["next_cursor"]
         except Exception as e:
-            st.error(f"Error: {str(e)}")
+            st.error(f"Failed to fetch order history: {str(e)}")
+
+    for order in st.session_state.get("history_orders", []):
+        order_id = order.get('order_id')
+        st.write(f"**Order ID:** {order_id}")
+        st.write(f"**Patient Name:** {order.get('patient_name')}")
+        st.write(f"**Doctor Name:** {order.get('doctor_name')}")
+        st.write(f"**Status:** {order.get('status')}")
+        st.write("**Prescribed Medicines:**")
+        for med in order.get("medicines", []):
+            st.write(f"- {med.get('name')} ({med.get('dosage')})")
+
+        # The invoice is fetched through the backend session only when asked
+        # for; BASE_URL is not reachable from the user's browser
+        if order.get("invoice"):
+            invoices = st.session_state.setdefault("history_invoices", {})
+            if st.button(f"Get Invoice for Order {order_id}", key=f"invoice_{order_id}"):
+                try:
+                    invoices[order_id] = fetch_invoice(order_id, order.get("version", 1))
+                except requests.RequestException:
+                    st.error("Failed to fetch invoice")
+            if order_id in invoices:
+                st.download_button(
+                    label=f"Download Invoice for Order {order_id}",
+                    data=invoices[order_id],
+                    file_name=order["invoice"].get("filename", f"invoice_{order_id}.pdf"),
+                    mime="application/pdf",
+                    key=f"download_{order_id}"
+                )
+        st.write("---")
+
+    if st.session_state.get("history_cursor") and st.button("Load More"):
+        try:
+            page = fetch_order_history(filters, st.session_state["history_cursor"])
+            st.session_state["history_orders"] += page["orders"]
+            st.session_state["history_cursor"] = page["next_cursor"]
+            st.rerun()
+        except Exception as e:
+            st.error(f"Failed to fetch order history: {str(e)}")
 
 
     
@@ -165,9 +257,8 @@ def track_order():
     order_id = st.text_input("Enter Order ID")
     if st.button("Track Order"):
         try:
-            response = requests.get(f"{BASE_URL}/track_order/{order_id}")
-            if response.status_code == 200:
-                order_data = response.json()
+            order_data = fetch_order(order_id)
+            if order_data:
                 st.write(f"**Order ID:** {order_data.get('order_id')}")
                 st.write(f"**Patient Name:** {order_data.get('patient_name')}")
                 st.write(f"**Doctor Name:** {order_data.get('doctor_name')}")
@@ -178,15 +269,15 @@ def track_order():
                 st.write("---")
 
                 # Download invoice button
-                invoice_response = requests.get(f"{BASE_URL}/download_invoice/{order_id}")
-                if invoice_response.status_code == 200:
+                try:
+                    invoice = fetch_invoice(order_id, order_data.get("version", 1))
                     st.download_button(
                         label="Download Invoice",
-                        data=invoice_response.content,
-                        file_name=f"invoice_{order_id}.txt",
-                        mime="text/plain"
+                        data=invoice,
+                        file_name=f"invoice_{order_id}.pdf",
+                        mime="application/pdf"
                     )
-                else:
+                except requests.RequestException:
                     st.error("Failed to fetch invoice")
             else:
                 st.error("Order not found")